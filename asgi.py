@@ -0,0 +1,13 @@
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from dashboard import app
+
+# ASGI serving mode: uvicorn asgi:application --host 0.0.0.0 --port 8050
+# Connections (slow clients, keep-alive, the map's endpoint queries) are held by the event loop and
+# every request runs the Dash (WSGI) app on a pool of ASGI_THREADS threads, off the loop. Chart builds
+# then go to the chart threads or worker processes (see cached_chart in dashboard.py), where identical
+# filter states are built once and superseded requests are dropped.
+# Needs `pip install -r requirements-asgi.txt`.
+application = WSGIMiddleware(app.server, workers=int(os.environ.get('ASGI_THREADS', 16)))
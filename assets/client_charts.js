@@ -0,0 +1,516 @@
+// Charts of the dashboard computed in the browser, used in client filtering mode (CLIENT_FILTERING=1).
+// The cube cells of the active dataset are fetched once from /client/cube (revalidated by ETag) and a
+// filter change only sums the selected cells here, like CubeSelection does on the server (charts.py).
+(function () {
+    var cubePromise = null;
+
+    var SHORT_TERM_NIGHTS = ['<=5', '5-10', '10-15', '15-20', '20-25', '25-30'];
+    var UNDER_6M_NIGHTS = ['30-60', '60-90', '90-120', '120-150', '150-180'];
+
+    var TYPED_ARRAYS = {uint8: Uint8Array, uint16: Uint16Array, uint32: Uint32Array, int32: Int32Array,
+                        float64: Float64Array};
+
+    // the payload of /client/cube (client_cube.BinaryPayload): a 4-byte header length, the JSON header and
+    // the little-endian typed arrays it describes, viewed in place
+    function parsePayload(buffer) {
+        var headerLength = new DataView(buffer).getUint32(0, true);
+        var header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+        var base = 4 + headerLength;
+        function decode(array) {
+            return new TYPED_ARRAYS[array.dtype](buffer, base + array.offset, array.length);
+        }
+        return {header: header, decode: decode};
+    }
+
+    // the app's path prefix, from the config Dash renders into the page
+    function requestsPrefix() {
+        var config = document.getElementById('_dash-config');
+        return config ? JSON.parse(config.textContent).requests_pathname_prefix : '/';
+    }
+
+    function loadCube() {
+        if (!cubePromise) {
+            cubePromise = fetch(requestsPrefix() + 'client/cube', {cache: 'no-cache'}).then(function (response) {
+                if (!response.ok) {
+                    throw new Error('client cube: HTTP ' + response.status);
+                }
+                return response.arrayBuffer();
+            }).then(function (buffer) {
+                var payload = parsePayload(buffer);
+                var snapshot = payload.header, decode = payload.decode;
+                function decodeAll(arrays) {
+                    var decoded = {};
+                    Object.keys(arrays).forEach(function (name) { decoded[name] = decode(arrays[name]); });
+                    return decoded;
+                }
+                var dims = {};
+                Object.keys(snapshot.dims).forEach(function (dim) {
+                    var dimension = snapshot.dims[dim];
+                    dims[dim] = {labels: dimension.labels, binned: dimension.binned, codes: decode(dimension.codes)};
+                });
+                var histograms = {};
+                Object.keys(snapshot.histograms).forEach(function (dim) {
+                    var histogram = snapshot.histograms[dim];
+                    histograms[dim] = {labels: histogram.labels, cells: decode(histogram.cells), bins: decode(histogram.bins),
+                                       measures: decodeAll(histogram.measures)};
+                });
+                var quantiles = snapshot.quantiles;
+                return {n: snapshot.n_cells, dims: dims, cells: decodeAll(snapshot.cells), histograms: histograms,
+                        quantiles: {values: decode(quantiles.values), cells: decode(quantiles.cells),
+                                    codes: decode(quantiles.codes), counts: decode(quantiles.counts),
+                                    relativeError: quantiles.relative_error},
+                        priceBins: decode(snapshot.price_bins), pricePercentiles: snapshot.price_percentiles,
+                        info: snapshot.info};
+            }).catch(function (error) {
+                cubePromise = null;
+                throw error;
+            });
+        }
+        return cubePromise;
+    }
+
+    // {column: allowed values} of the filter controls, as filters.parse_filters
+    function parseFilters(selectedNeighbourhood, checkSuperHost, listingType, priceType, termType, reviewedListings) {
+        var filters = {};
+        if (selectedNeighbourhood) {
+            var nbLs = selectedNeighbourhood.split(' | ');
+            filters.neighbourhood_group = [nbLs[0]];
+            if (nbLs.length > 1) {
+                filters.neighbourhood = [nbLs[1]];
+            }
+        }
+        if (checkSuperHost === 'Yes') {
+            filters.host_is_superhost = ['t'];
+        }
+        if (listingType && listingType.length) {
+            filters.room_type = listingType;
+        }
+        if (priceType && priceType.length) {
+            filters.price_bin = priceType;
+        }
+        if (termType === 'Short Term' || termType === 'Long Term') {
+            filters.term_rentals = [termType];
+        }
+        if (reviewedListings === 'Yes') {
+            filters.reviewed = [true];
+        }
+        return filters;
+    }
+
+    // aggregates of the cube cells matching a filter, as filter_cube.CubeSelection
+    function Selection(cube, filters) {
+        var mask = new Uint8Array(cube.n).fill(1);
+        Object.keys(filters).forEach(function (dim) {
+            var dimension = cube.dims[dim];
+            var allowed = new Uint8Array(dimension.labels.length + 1);
+            filters[dim].forEach(function (value) {
+                var code = dimension.labels.indexOf(value);
+                if (code >= 0) {
+                    allowed[code] = 1;
+                }
+            });
+            for (var i = 0; i < cube.n; i++) {
+                if (!allowed[dimension.codes[i]]) {
+                    mask[i] = 0;
+                }
+            }
+        });
+        this.cube = cube;
+        this.mask = mask;
+    }
+
+    Selection.prototype.total = function (measure) {
+        var values = this.cube.cells[measure || 'count'];
+        var total = 0;
+        for (var i = 0; i < this.cube.n; i++) {
+            if (this.mask[i]) {
+                total += values[i];
+            }
+        }
+        return total;
+    };
+
+    Selection.prototype.mean = function () {
+        var n = this.total('price_count');
+        return n ? this.total('price') / n : NaN;
+    };
+
+    // listings per code of dim, the last code being missing values
+    Selection.prototype.codeCounts = function (dim) {
+        var dimension = this.cube.dims[dim];
+        var counts = new Float64Array(dimension.labels.length + 1);
+        var values = this.cube.cells.count;
+        for (var i = 0; i < this.cube.n; i++) {
+            if (this.mask[i]) {
+                counts[dimension.codes[i]] += values[i];
+            }
+        }
+        return counts;
+    };
+
+    // {labels, values}; binned dimensions list every bin and others only observed values
+    Selection.prototype.counts = function (dim) {
+        var dimension = this.cube.dims[dim];
+        var counts = this.codeCounts(dim);
+        var result = {labels: [], values: []};
+        dimension.labels.forEach(function (label, code) {
+            if (dimension.binned || counts[code] > 0) {
+                result.labels.push(label);
+                result.values.push(counts[code]);
+            }
+        });
+        return result;
+    };
+
+    Selection.prototype.observed = function (dim) {
+        var counts = this.codeCounts(dim);
+        var observed = 0;
+        for (var code = 0; code < this.cube.dims[dim].labels.length; code++) {
+            if (counts[code] > 0) {
+                observed++;
+            }
+        }
+        return observed;
+    };
+
+    // totals per bin of a histogram dimension, from its non-zero (cell, bin) entries
+    Selection.prototype.histogram = function (dim, measure) {
+        var histogram = this.cube.histograms[dim];
+        var values = histogram.measures[measure || 'count'];
+        var totals = new Array(histogram.labels.length + 1).fill(0);
+        for (var i = 0; i < values.length; i++) {
+            if (this.mask[histogram.cells[i]]) {
+                totals[histogram.bins[i]] += values[i];
+            }
+        }
+        return totals.slice(0, histogram.labels.length);
+    };
+
+    // first index whose cumulative count exceeds x
+    function searchRight(cum, x) {
+        var lo = 0, hi = cum.length;
+        while (lo < hi) {
+            var mid = (lo + hi) >> 1;
+            if (cum[mid] > x) {
+                hi = mid;
+            } else {
+                lo = mid + 1;
+            }
+        }
+        return lo;
+    }
+
+    // value at quantile q of one row of the (groups x values) histogram, interpolated like pandas
+    function quantileRow(hist, start, values, q) {
+        var cum = new Float64Array(values.length);
+        var n = 0;
+        for (var i = 0; i < values.length; i++) {
+            n += hist[start + i];
+            cum[i] = n;
+        }
+        if (!n) {
+            return NaN;
+        }
+        var position = (n - 1) * q;
+        var below = Math.floor(position);
+        var lo = values[searchRight(cum, below)];
+        var hi = values[searchRight(cum, Math.ceil(position))];
+        return lo + (hi - lo) * (position - below);
+    }
+
+    // quantiles of the price per code of `by` (or overall as group 0), merged from the per-cell distributions
+    Selection.prototype.quantiles = function (qs, by) {
+        var quantiles = this.cube.quantiles;
+        var values = quantiles.values;
+        var groupCodes = by ? this.cube.dims[by].codes : null;
+        var nGroups = by ? this.cube.dims[by].labels.length + 1 : 1;
+        var hist = new Float64Array(nGroups * values.length);
+        for (var i = 0; i < quantiles.cells.length; i++) {
+            var cell = quantiles.cells[i];
+            if (this.mask[cell]) {
+                hist[(groupCodes ? groupCodes[cell] : 0) * values.length + quantiles.codes[i]] += quantiles.counts[i];
+            }
+        }
+        var result = [];
+        for (var group = 0; group < nGroups; group++) {
+            result.push(qs.map(function (q) { return quantileRow(hist, group * values.length, values, q); }));
+        }
+        return result;
+    };
+
+    // median price per value of `by` present in the selection
+    Selection.prototype.medianBy = function (by) {
+        var dimension = this.cube.dims[by];
+        var present = new Uint8Array(dimension.labels.length + 1);
+        for (var i = 0; i < this.cube.n; i++) {
+            if (this.mask[i]) {
+                present[dimension.codes[i]] = 1;
+            }
+        }
+        var medians = this.quantiles([0.5], by);
+        var result = [];
+        dimension.labels.forEach(function (label, code) {
+            if (present[code]) {
+                result.push({label: label, price: medians[code][0]});
+            }
+        });
+        return result;
+    };
+
+    // numbers are rounded half to even, as Python and numpy do
+    function roundHalfEven(value) {
+        var rounded = Math.round(value);
+        return Math.abs(value % 1) === 0.5 ? 2 * Math.round(value / 2) : rounded;
+    }
+
+    function toFixed(value, digits) {
+        if (isNaN(value)) {
+            return 'nan';
+        }
+        var scale = Math.pow(10, digits);
+        var floor = Math.floor(value * scale);
+        if (value * scale - floor === 0.5 && (floor + 0.5) / scale === value) {
+            return ((floor % 2 ? floor + 1 : floor) / scale).toFixed(digits);
+        }
+        return value.toFixed(digits);
+    }
+
+    function percentages(values) {
+        var total = values.reduce(function (a, b) { return a + b; }, 0);
+        return values.map(function (value) { return roundHalfEven(value / total * 1000) / 10; });
+    }
+
+    function argmax(values) {
+        var best = 0;
+        values.forEach(function (value, i) {
+            if (value > values[best]) {
+                best = i;
+            }
+        });
+        return best;
+    }
+
+    function formatNumber(number) {
+        if (number < 1000) {
+            return String(roundHalfEven(number));
+        } else if (number < 1000000) {
+            return toFixed(number / 1000, 1) + 'K';
+        }
+        return toFixed(number / 1000000, 1) + 'M';
+    }
+
+    function component(type, children, props, namespace) {
+        return {type: type, namespace: namespace || 'dash_html_components',
+                props: Object.assign({children: children}, props || {})};
+    }
+
+    function description(paragraphs) {
+        return component('Small', paragraphs.map(function (text) { return component('P', text); }));
+    }
+
+    // figure of the page with a chart update written into a copy, as charts.apply_figure_update
+    function applyFigureUpdate(figure, update) {
+        Object.keys(update).forEach(function (key) {
+            var value = update[key];
+            if (value !== null && typeof value === 'object' && !Array.isArray(value)) {
+                if (figure[key] === undefined) {
+                    figure[key] = {};
+                }
+                applyFigureUpdate(figure[key], value);
+            } else {
+                figure[key] = value;
+            }
+        });
+        return figure;
+    }
+
+    function updatedFigure(figure, update) {
+        return applyFigureUpdate(JSON.parse(JSON.stringify(figure)), update);
+    }
+
+    // position of a price on the binned price axis, as charts.price_axis_position
+    function priceAxisPosition(bins, price) {
+        var code = 0;
+        while (code < bins.length && bins[code] < price) {
+            code++;
+        }
+        code -= 1;
+        var lo = bins[code], hi = bins[code + 1];
+        if (!isFinite(lo) || !isFinite(hi)) {
+            return code;
+        }
+        return code - 0.5 + (price - lo) / (hi - lo);
+    }
+
+    function generalStats(selection) {
+        var center = {className: 'text-center'};
+        function stat(title, value) {
+            return component('Col', [component('H6', title, center), component('P', value, center)], {},
+                             'dash_bootstrap_components');
+        }
+        return component('Row', [component('H4', 'General Statistics', center),
+                                 stat('Total Listings', String(selection.total())),
+                                 stat('Average Price', '$' + toFixed(selection.mean(), 2)),
+                                 stat('Median Price', ' $' + toFixed(selection.quantiles([0.5])[0][0], 2))],
+                         {}, 'dash_bootstrap_components');
+    }
+
+    function roomTypeChart(selection) {
+        var counts = selection.counts('room_type');
+        var popular = counts.labels.map(function (label, i) { return [label, counts.values[i]]; })
+            .sort(function (a, b) { return b[1] - a[1]; })
+            .slice(0, 2).map(function (pair) { return pair[0]; }).join(' and ');
+        return [{data: {0: {labels: counts.labels, values: counts.values}}},
+                description([selection.cube.info.room_type,
+                             '[INSIGHTS] Most of the listings available are generally ' + popular + ' in this area.'])];
+    }
+
+    function termRentalsChart(selection, termType) {
+        var labels, values, xTitle, plotTitle, text1, text2 = '', text3 = '';
+        if (!termType) {
+            var counts = selection.counts('term_rentals');
+            labels = counts.labels;
+            values = counts.values;
+            xTitle = 'Rental Term';
+            plotTitle = 'Rental Term Distribution';
+            text1 = "[ACTION]: Please Toggle 'Term of Rental' filter to see additional breakdown on Minimum number of nights";
+        } else {
+            var short = termType === 'Short Term';
+            var nights = selection.histogram('minimum_nights_bin');
+            labels = [];
+            values = [];
+            selection.cube.histograms.minimum_nights_bin.labels.forEach(function (label, bin) {
+                if ((SHORT_TERM_NIGHTS.indexOf(label) >= 0) === short) {
+                    labels.push(label);
+                    values.push(nights[bin]);
+                }
+            });
+            xTitle = 'Minimum Nights to book';
+            plotTitle = short ? 'Short Term Rentals Distribution' : 'Long Term Term Rentals Distribution';
+            text1 = "[ACTION] Please Remove 'Term of Rental' filter to go back to seeing Overall Rental Term Distribution";
+            if (short) {
+                text2 = '[INSIGHTS] ' + values[labels.indexOf('<=5')] + ' listings have <5 Minimum nights policy. ' +
+                        'Majorly Listings have ' + labels[argmax(values)] + ' nights as Minimum nights policy';
+                text3 = selection.cube.info.short_term;
+            } else {
+                var over6m = values.filter(function (value, i) { return UNDER_6M_NIGHTS.indexOf(labels[i]) < 0; })
+                    .reduce(function (a, b) { return a + b; }, 0);
+                text2 = '[INSIGHTS] Majorly Listings have ' + labels[argmax(values)] + ' nights as Minimum nights policy. ' +
+                        over6m + ' listings have more than 6m as Minimum nights Policy';
+                text3 = selection.cube.info.long_term;
+            }
+        }
+        return [{data: {0: {x: labels, y: values, text: percentages(values)}},
+                 layout: {title: {text: plotTitle}, xaxis: {title: {text: xTitle}}}},
+                description([text1, text2, text3])];
+    }
+
+    function availabilityChart(selection, viewAvgTotal) {
+        var labels = selection.cube.histograms.last_1yr_availability.labels;
+        var counts = selection.histogram('last_1yr_availability');
+        var prices = selection.histogram('last_1yr_availability', 'price');
+        var average = prices.map(function (price, i) { return price / counts[i]; });
+        var total = selection.histogram('last_1yr_availability', 'earnings');
+        var earningsText = labels.slice(1).map(function (label, i) {
+            return 'Average: ' + formatNumber(average[i + 1]) + ', Total: ' + formatNumber(total[i + 1]);
+        });
+        var showAverage = viewAvgTotal === 'Show Average Earnings';
+        return [{data: {0: {x: labels, y: counts, text: percentages(counts)},
+                        1: {x: labels.slice(1), y: (showAverage ? average : total).slice(1), text: earningsText}},
+                 layout: {title: {text: showAverage ? 'Last 365 Days availability and Average Earnings per night' :
+                                                      'Last 365 Days availability and Total Earnings'},
+                          yaxis2: {title: {text: showAverage ? 'Earnings per night in Dollars' : 'Total Earnings in Dollars'}}}},
+                description(["[ACTION] Toggle filter below the chart to switch between viewing 'Average Earnings' and " +
+                             "'Total Earnings'. Total Earnings is actually overall earning of the cohort. " +
+                             'Calculated by (Price_per_night)*(number_of_night_booked)',
+                             '[ACTION] Check Average earnings per night for different cohorts by toggling filters.',
+                             selection.cube.info.availability])];
+    }
+
+    function priceDistributionChart(selection) {
+        var cube = selection.cube;
+        var counts = selection.counts('price_bin');
+        var qs = cube.pricePercentiles;
+        var prices = selection.quantiles(qs)[0];
+        var shapes = [], annotations = [], insights = [];
+        qs.forEach(function (q, i) {
+            if (isNaN(prices[i])) {
+                return;
+            }
+            var x = priceAxisPosition(cube.priceBins, prices[i]);
+            var label = roundHalfEven(q * 100);
+            shapes.push({type: 'line', x0: x, x1: x, xref: 'x', y0: 0, y1: 1, yref: 'y domain',
+                         line: {color: 'grey', dash: 'dot'}});
+            annotations.push({text: 'p' + label, x: x, xref: 'x', y: 1, yref: 'y domain', showarrow: false,
+                              xanchor: shapes.length % 2 ? 'right' : 'left', yanchor: 'top'});
+            insights.push(label + '% of listings cost up to $' + toFixed(prices[i], 0));
+        });
+        var text1 = '';
+        if (insights.length) {
+            text1 = '[INSIGHTS] ' + insights.join(', ') + ' per night.';
+            if (cube.quantiles.relativeError) {
+                text1 += ' (approximate, within ' + toFixed(cube.quantiles.relativeError * 100, 1) + '%)';
+            }
+        }
+        return [{data: {0: {x: counts.labels, y: counts.values, text: percentages(counts.values)}},
+                 layout: {shapes: shapes, annotations: annotations}},
+                description([text1, cube.info.price_distribution])];
+    }
+
+    function areaPriceChart(selection, selectedNeighbourhood) {
+        var nbLs = selectedNeighbourhood ? selectedNeighbourhood.split(' | ') : [];
+        var medians, xTitle, text1 = '';
+        if (selection.observed('neighbourhood_group') > 1) {
+            medians = selection.medianBy('neighbourhood_group');
+            xTitle = 'Neighood Group';
+            text1 = "[ACTION] Select a neighbourhood group from 'Area' Filter to see median prices for areas in the Neighbourhood.";
+        } else {
+            medians = selection.medianBy('neighbourhood');
+            xTitle = 'Neighood Area';
+            if (nbLs.length > 1) {
+                text1 = "[ACTION] Select '" + nbLs[0] + "' from 'Area' filter to switch back to comparing prices of all areas from " +
+                        nbLs[0] + ' neighbourhood';
+            }
+        }
+        // ascending, areas without prices last
+        medians.sort(function (a, b) {
+            if (isNaN(a.price) || isNaN(b.price)) {
+                return isNaN(a.price) - isNaN(b.price);
+            }
+            return a.price - b.price;
+        });
+        return [{data: {0: {x: medians.map(function (m) { return m.label; }), y: medians.map(function (m) { return m.price; })}},
+                 layout: {xaxis: {title: {text: xTitle}}}},
+                description([text1, selection.cube.info.area_price])];
+    }
+
+    // clientside callback of a chart: (6 filter control values, other inputs..., current figure) -> [figure, description];
+    // `chart` gets the selection, the filter control values and the other inputs
+    function chartCallback(chart) {
+        return function () {
+            var args = Array.prototype.slice.call(arguments);
+            var filterValues = args.slice(0, 6);
+            var figure = args[args.length - 1];
+            return loadCube().then(function (cube) {
+                var selection = new Selection(cube, parseFilters.apply(null, filterValues));
+                var result = chart.apply(null, [selection, filterValues].concat(args.slice(6, -1)));
+                return [updatedFigure(figure, result[0]), result[1]];
+            });
+        };
+    }
+
+    window.dash_clientside = window.dash_clientside || {};
+    window.dash_clientside.client_charts = {
+        stats: function () {
+            var filterValues = Array.prototype.slice.call(arguments, 0, 6);
+            return loadCube().then(function (cube) {
+                return generalStats(new Selection(cube, parseFilters.apply(null, filterValues)));
+            });
+        },
+        room_type: chartCallback(function (selection) { return roomTypeChart(selection); }),
+        term_rentals: chartCallback(function (selection, filterValues) { return termRentalsChart(selection, filterValues[4]); }),
+        availability: chartCallback(function (selection, filterValues, viewAvgTotal) { return availabilityChart(selection, viewAvgTotal); }),
+        price_distribution: chartCallback(function (selection) { return priceDistributionChart(selection); }),
+        area_price: chartCallback(function (selection, filterValues) { return areaPriceChart(selection, filterValues[0]); })
+    };
+})();
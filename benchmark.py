@@ -0,0 +1,182 @@
+import argparse
+import json
+import resource
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+from plotly.io.json import to_json_plotly
+
+from charts import CHART_STAGES, EARNINGS_VIEWS
+from data_store import prepare_listings
+from datasets import Dataset
+from features import derive_features, PRICE_LABELS
+from filters import parse_filters
+from schema import apply_schema
+from synthetic_listings import generate_listings
+
+# browser viewport the map endpoints are queried for, in pixels
+VIEWPORT_PX = (1000, 600)
+
+
+class StageTimer:
+    """Latency samples, output payload sizes and (optionally) peak traced memory per stage."""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.seconds = defaultdict(list)
+        self.payloads = defaultdict(list)
+        self.peaks = defaultdict(int)
+
+    def run(self, stage, compute, payload=False):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = compute()
+        self.seconds[stage].append(time.perf_counter() - start)
+        if self.trace_memory:
+            self.peaks[stage] = max(self.peaks[stage], tracemalloc.get_traced_memory()[1] - start_memory)
+        if payload:
+            self.payloads[stage].append(len(to_json_plotly(result)))
+        return result
+
+    def report(self):
+        report = {}
+        for stage, seconds in self.seconds.items():
+            ms = np.array(seconds) * 1000
+            report[stage] = {'count': len(ms), 'p50_ms': float(np.percentile(ms, 50)),
+                             'p90_ms': float(np.percentile(ms, 90)), 'p99_ms': float(np.percentile(ms, 99)),
+                             'max_ms': float(ms.max())}
+            if self.payloads[stage]:
+                report[stage]['payload_bytes'] = int(np.mean(self.payloads[stage]))
+            if self.trace_memory:
+                report[stage]['peak_mb'] = self.peaks[stage] / 1e6
+        return report
+
+
+# filter control values (in the order of filter_inputs) and earnings toggle of every request;
+# from a FILTER_LOG recording of the dashboard, or a random mix over the dataset's options
+def filter_mix(dataset, n_requests, seed=0, path=None):
+    if path:
+        with open(path) as f:
+            recorded = [json.loads(line) for line in f if line.strip()]
+        return [(values, EARNINGS_VIEWS[i % 2]) for i, values in enumerate(recorded[:n_requests] if n_requests else recorded)]
+
+    rng = np.random.default_rng(seed)
+    groups = [nb for nb in dataset.neighbourhood_options if ' | ' not in nb]
+    areas = [nb for nb in dataset.neighbourhood_options if ' | ' in nb]
+
+    def some(options, p_none):
+        if rng.random() < p_none:
+            return None
+        return list(rng.choice(options, rng.integers(1, len(options) + 1), replace=False))
+
+    mix = []
+    for _ in range(n_requests):
+        area_kind = rng.random()
+        area = None if area_kind < 0.4 else str(rng.choice(groups)) if area_kind < 0.75 else str(rng.choice(areas))
+        values = [area,
+                  'Yes' if rng.random() < 0.2 else 'No',
+                  some(dataset.room_type_options, 0.5),
+                  some(PRICE_LABELS, 0.7),
+                  None if rng.random() < 0.7 else str(rng.choice(['Short Term', 'Long Term'])),
+                  'Yes' if rng.random() < 0.2 else 'No']
+        mix.append((values, EARNINGS_VIEWS[int(rng.random() < 0.3)]))
+    return mix
+
+
+# (west, south, east, north) of the viewport centred on a map view
+def viewport(view):
+    degrees_per_px = 360 / (256 * 2 ** view['zoom'])
+    half_width, half_height = VIEWPORT_PX[0] / 2 * degrees_per_px, VIEWPORT_PX[1] / 2 * degrees_per_px
+    return [view['lon'] - half_width, view['lat'] - half_height, view['lon'] + half_width, view['lat'] + half_height]
+
+
+def run_benchmark(rows, n_requests, seed=0, csv_path=None, mix_path=None, trace_memory=False):
+    if trace_memory:
+        tracemalloc.start()
+    build = StageTimer(trace_memory)
+    if csv_path:
+        listings_df = build.run('prepare', lambda: prepare_listings(csv_path))
+    else:
+        raw_df = build.run('generate', lambda: generate_listings(rows, seed))
+        listings_df = build.run('prepare', lambda: apply_schema(derive_features(raw_df)))
+        raw_df = None
+    dataset = build.run('build', lambda: Dataset('benchmark', csv_path or 'synthetic').build(listings_df=listings_df))
+    # the dashboard keeps only the dataset, not the listings DataFrame
+    n_rows, listings_df = len(listings_df), None
+
+    mix = filter_mix(dataset, n_requests, seed, mix_path)
+    requests = StageTimer(trace_memory)
+    for values, view in mix:
+        filters = parse_filters(*values)
+        selection = requests.run('selection', lambda: dataset.aggregator.selection('benchmark', filters))
+        for stage, (chart, extra) in CHART_STAGES.items():
+            requests.run(stage, lambda: chart(selection, *extra(values, view)), payload=True)
+        map_view = requests.run('map_view', lambda: dataset.map_view(filters), payload=True)
+        if map_view is not None:
+            requests.run('map_clusters', lambda: dataset.map_clusters(filters, map_view['zoom'], viewport(map_view)),
+                         payload=True)
+            requests.run('map_stats', lambda: dataset.map_stats(filters, viewport(map_view)), payload=True)
+
+    return {'config': {'rows': n_rows, 'requests': len(mix), 'seed': seed, 'csv': csv_path, 'mix': mix_path},
+            'build': build.report(), 'requests': requests.report(),
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+# stages whose p50 latency grew by more than `threshold` times (and min_ms) over the baseline
+def regressions(result, baseline, threshold=1.25, min_ms=0.5):
+    found = []
+    for section in ('build', 'requests'):
+        for stage, stats in result[section].items():
+            base = baseline.get(section, {}).get(stage)
+            if base and stats['p50_ms'] > base['p50_ms'] * threshold and stats['p50_ms'] - base['p50_ms'] > min_ms:
+                found.append((section, stage, base['p50_ms'], stats['p50_ms']))
+    return found
+
+
+def print_report(result, baseline=None):
+    print(f"{result['config']['rows']} listings, {result['config']['requests']} requests, "
+          f"peak RSS {result['peak_rss_mb']:.0f} MB")
+    for section in ('build', 'requests'):
+        print(f"\n{section:<20}{'n':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'payload':>10}{'peak MB':>9}{'vs base':>9}")
+        for stage, stats in result[section].items():
+            base = (baseline or {}).get(section, {}).get(stage)
+            ratio = f"{stats['p50_ms'] / base['p50_ms']:.2f}x" if base and base['p50_ms'] else ''
+            payload = stats.get('payload_bytes', '')
+            peak = f"{stats['peak_mb']:.1f}" if 'peak_mb' in stats else ''
+            print(f"{stage:<20}{stats['count']:>6}{stats['p50_ms']:>10.2f}{stats['p90_ms']:>10.2f}"
+                  f"{stats['p99_ms']:>10.2f}{payload:>10}{peak:>9}{ratio:>9}")
+
+
+# python benchmark.py --rows 1000000 --requests 200 --output bench.json --baseline previous.json
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the dashboard chart pipeline on synthetic or real listings.')
+    parser.add_argument('--rows', type=int, default=100_000, help='synthetic listings to generate')
+    parser.add_argument('--requests', type=int, default=100, help='filter changes to replay')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--csv', help='benchmark this listings csv instead of synthetic data')
+    parser.add_argument('--mix', help='json lines of filter control values, e.g. recorded with FILTER_LOG')
+    parser.add_argument('--trace-memory', action='store_true', help='peak traced memory per stage (slower)')
+    parser.add_argument('--output', help='write the results as json')
+    parser.add_argument('--baseline', help='results json of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=1.25, help='p50 ratio over the baseline flagged as regression')
+    args = parser.parse_args()
+
+    result = run_benchmark(args.rows, args.requests, args.seed, args.csv, args.mix, args.trace_memory)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    if baseline:
+        found = regressions(result, baseline, args.threshold)
+        for section, stage, before, after in found:
+            print(f'REGRESSION {section}/{stage}: p50 {before:.2f} ms -> {after:.2f} ms')
+        sys.exit(1 if found else 0)
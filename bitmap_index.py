@@ -0,0 +1,89 @@
+import numpy as np
+
+from filter_cube import encode_column, merged_labels
+
+# number of set bits in every possible byte
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class BitmapIndex:
+    """One packed bitmap per value of each indexed column.
+
+    Filters are combined with bitwise OR within a column and AND across columns,
+    so no intermediate DataFrame is built; only the final row positions are
+    unpacked.
+    """
+
+    def __init__(self, df, columns):
+        self._build(BitmapBuilder(columns).add(df))
+
+    # index of the listings chunks added to a BitmapBuilder
+    @classmethod
+    def from_builder(cls, builder):
+        index = cls.__new__(cls)
+        index._build(builder)
+        return index
+
+    def _build(self, builder):
+        self.n_rows = builder.n_rows
+        self.bitmaps = {}
+        for column, parts in builder.parts.items():
+            # a value missing from a chunk has no bits set there
+            self.bitmaps[column] = {label: np.concatenate([parts[label].get(chunk, np.zeros(size, dtype=np.uint8))
+                                                           for chunk, size in enumerate(builder.chunk_bytes)])
+                                    for label in merged_labels(parts, builder.binned[column])}
+        self.all_rows = np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    # packed bitmap of the rows matching a {column: allowed values} filter; with a `trace` list,
+    # (column, rows in, rows out) of every filter step is appended to it
+    def select(self, filters, trace=None):
+        selected = self.all_rows.copy()
+        for column, values in filters.items():
+            matches = np.zeros_like(selected)
+            for value in values:
+                bitmap = self.bitmaps[column].get(value)
+                if bitmap is not None:
+                    np.bitwise_or(matches, bitmap, out=matches)
+            rows_in = self.count(selected) if trace is not None else None
+            np.bitwise_and(selected, matches, out=selected)
+            if trace is not None:
+                trace.append((column, rows_in, self.count(selected)))
+        return selected
+
+    def count(self, bitmap):
+        return int(_POPCOUNT[bitmap].sum(dtype=np.int64))
+
+    # whether each of `rows` is set, without unpacking the whole bitmap
+    def contains(self, bitmap, rows):
+        return ((bitmap[rows >> 3] >> (7 - (rows & 7))) & 1).astype(bool)
+
+    # row positions of the set bits
+    def rows(self, bitmap):
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n_rows))
+
+
+class BitmapBuilder:
+    """Packed bitmaps of listings added chunk by chunk (at least one), see BitmapIndex.from_builder.
+
+    Every chunk but the last must hold a multiple of 8 rows, so the bitmaps of
+    consecutive chunks are joined byte by byte.
+    """
+
+    def __init__(self, columns):
+        self.n_rows = 0
+        self.chunk_bytes = []
+        self.binned = {}
+        # column -> label -> {chunk: packed bitmap of the chunk's rows}
+        self.parts = {column: {} for column in columns}
+
+    def add(self, df):
+        if self.n_rows % 8:
+            raise ValueError(f'a chunk follows {self.n_rows} rows, only the last chunk may hold a partial byte')
+        chunk = len(self.chunk_bytes)
+        for column, parts in self.parts.items():
+            codes, labels, self.binned[column] = encode_column(df[column])
+            for i, label in enumerate(labels):
+                parts.setdefault(label, {})[chunk] = np.packbits(codes == i)
+        self.chunk_bytes.append((len(df) + 7) // 8)
+        self.n_rows += len(df)
+        return self
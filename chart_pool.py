@@ -0,0 +1,135 @@
+import multiprocessing
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from incremental import IncrementalAggregator
+
+# snapshots attached by a worker process: first block name -> (aggregator over the shared cube, blocks)
+_attached = OrderedDict()
+# snapshots a worker keeps attached, the active dataset and the one it replaced
+MAX_ATTACHED = 2
+
+
+class SharedSnapshot:
+    """Read-only copy of an object whose numpy arrays live in shared memory.
+
+    The object is pickled with out-of-band buffers: every contiguous array is
+    copied once into its own shared memory block and only the small remaining
+    pickle is sent to other processes, which rebuild the object around the
+    shared blocks without copying them.
+    """
+
+    def __init__(self, obj):
+        buffers = []
+        data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+        self.blocks = []
+        sizes = []
+        for buffer in buffers:
+            raw = buffer.raw()
+            block = shared_memory.SharedMemory(create=True, size=max(raw.nbytes, 1))
+            block.buf[:raw.nbytes] = raw
+            self.blocks.append(block)
+            sizes.append(raw.nbytes)
+        # picklable description passed to the workers
+        self.handle = (data, [(block.name, size) for block, size in zip(self.blocks, sizes)])
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+# the object of a snapshot handle, with its arrays read-only views of the shared blocks
+def attach_snapshot(handle):
+    data, blocks = handle
+    attached = [shared_memory.SharedMemory(name=name) for name, _ in blocks]
+    buffers = [block.buf[:size].toreadonly() for block, (_, size) in zip(attached, blocks)]
+    return pickle.loads(data, buffers=buffers), attached
+
+
+def _aggregator(handle):
+    key = handle[1][0][0]
+    if key not in _attached:
+        (cube, sankey), blocks = attach_snapshot(handle)
+        _attached[key] = (IncrementalAggregator(cube, sankey), blocks)
+        while len(_attached) > MAX_ATTACHED:
+            _attached.popitem(last=False)
+    _attached.move_to_end(key)
+    return _attached[key][0]
+
+
+def _ready():
+    return True
+
+
+def _build_chart(handle, chart, filters, session_id, args):
+    return chart(_aggregator(handle).selection(session_id, filters), *args)
+
+
+class ChartPool:
+    """Process pool that builds charts from shared, read-only snapshots of a cube.
+
+    Every chart callback submits its chart here, so charts requested together are
+    built on separate cores and the cube arrays exist once per host whatever the
+    number of workers. Workers attach a snapshot on first use. Chart functions
+    must be importable module-level functions taking a CubeSelection.
+    """
+
+    def __init__(self, workers):
+        # fork where available; the workers are started here, before the server runs any threads
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        self.executor = ProcessPoolExecutor(workers, mp_context=context)
+        for future in [self.executor.submit(_ready) for _ in range(workers)]:
+            future.result()
+
+    # future of a chart built from the SharedSnapshot of a (cube, sankey) pair
+    def submit(self, snapshot, chart, filters, session_id, *args):
+        return self.executor.submit(_build_chart, snapshot.handle, chart, filters, session_id, args)
+
+    def build(self, snapshot, chart, filters, session_id, *args):
+        return self.submit(snapshot, chart, filters, session_id, *args).result()
+
+    def close(self):
+        self.executor.shutdown()
+
+
+class ChartScheduler:
+    """Waits for chart builds queued on an executor, keeping only the latest one per slot.
+
+    A slot is e.g. a (session, chart) pair: when a newer build is queued for
+    the same slot, the previous one is cancelled unless it has already
+    started, and its caller gets CancelledError. Builds without a slot are
+    never superseded.
+
+    Only queued builds are dropped: a build that is already running is not
+    interrupted between its stages, it completes and its result is returned
+    to its (possibly stale) caller.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.cancelled = 0
+        self.lock = threading.Lock()
+
+    # result of the future returned by submit()
+    def run(self, slot, submit):
+        future = submit()
+        if slot is None:
+            return future.result()
+        with self.lock:
+            previous = self.pending.get(slot)
+            self.pending[slot] = future
+        if previous is not None and previous.cancel():
+            with self.lock:
+                self.cancelled += 1
+        try:
+            return future.result()
+        finally:
+            with self.lock:
+                if self.pending.get(slot) is future:
+                    del self.pending[slot]
@@ -0,0 +1,431 @@
+import copy
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from dash import html
+from features import PRICE_BINS
+
+# Every chart of the dashboard is built by its own function from the CubeSelection
+# of the filtered listings, so each callback only computes what it displays.
+# Figures are built once as templates (below); chart functions return figure updates,
+# nested dicts of only the data arrays and titles that depend on the filters, which
+# the dashboard sends as Dash Patches onto the templates already in the page.
+
+# price percentiles drawn on the price distribution
+PRICE_PERCENTILES = [0.25, 0.5, 0.75, 0.9]
+# [INFO] paragraphs of the chart descriptions, also shipped to the browser in client filtering mode
+CHART_INFO = {
+    'room_type':
+        '[INFO] Airbnb hosts have the option to offer various types of accommodations including entire homes or '
+        'apartments, private rooms, shared rooms, and, more recently, hotel rooms.The type of room and the manner '
+        'in which it is managed can make some Airbnb listings operate similarly to hotels, which can be disruptive '
+        'for neighbors, reduce available housing, and in some cases, contravene local laws.',
+    'short_term':
+        "[INFO] Airbnb's short-term rental policies often require hosts to register and obtain licenses, adhere to "
+        'occupancy and duration limits to prevent residential properties from becoming full-time vacation rentals, '
+        'and comply with local tax regulations. Safety standards, such as fire and health safety compliance, are '
+        'also mandated in many jurisdictions. These regulations aim to balance the interests of short-term rentals '
+        'with community needs and safety.',
+    'long_term':
+        "[INFO] Airbnb's long-term rental policies include a modified payment structure where guests pay monthly "
+        'instead of upfront, making financial management easier and more akin to traditional leasing. Cancellation '
+        'policies for these rentals require a 30-day notice, providing security for both parties but also imposing '
+        'a potential cost on guests who cancel mid-stay. Additionally, compliance with local housing regulations, '
+        'potential requirements for lease agreements, and adherence to safety and maintenance standards ensure '
+        "that long-term stays align with both Airbnb's guidelines and local laws.",
+    'availability':
+        '[INFO] Booking data can highlight demand trends, showing when and where properties are most sought after. '
+        'A high number of days booked suggests strong market demand or less strict local rental regulations, while '
+        'properties with fewer bookings might indicate overpricing or a saturated market. A prevalence of heavily '
+        'booked listings may point to professional hosting operations rather than individual hosts. By correlating '
+        'availability with earnings, hosts can optimize pricing to maximize revenue during peak demand periods.',
+    'price_distribution':
+        '[INFO] Price distribution data can reveal pricing trends and market segmentation, helping to identify '
+        'budget, mid-range, and luxury accommodations. Competitive analysis through price distribution helps hosts '
+        'adjust their rates competitively. Over time, this can uncover long-term trends in regional attractiveness '
+        'and market dynamics.',
+    'area_price':
+        '[INFO] Area-wise median price analysis for listings can highlight regional pricing benchmarks, helping '
+        'travelers and hosts make informed decisions about lodging costs. These prices can also reflect the '
+        'economic health and desirability of different areas, influencing real estate valuations and investment '
+        'opportunities. Comparisons across regions can reveal market saturation or untapped opportunities, guiding '
+        'new hosts on where to establish their listings competitively.',
+}
+# layout shared by the dashboard figures
+FIGURE_LAYOUT = dict(font_size=12, margin=dict(l=20, r=20, t=40, b=20), title=dict(x=0.01, y=0.97), paper_bgcolor='aliceblue')
+
+
+def _bar_template(title, x_title, y_title, **bar):
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Bar(x=[], y=[], hovertemplate=f'%{{x}}<br>{y_title}=%{{y}}<extra></extra>', **bar))
+    fig.update_layout(title_text=title, xaxis_title=x_title, yaxis_title=y_title, barmode='relative', **FIGURE_LAYOUT)
+    return fig
+
+
+def figure_templates():
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    room_type = go.Figure(go.Pie(labels=[], values=[], textinfo='value+percent',
+                                 hovertemplate='room_type=%{label}<br>count of listings=%{value}<extra></extra>'))
+    room_type.update_layout(title_text='Room Type Distribution', **FIGURE_LAYOUT)
+
+    term_rentals = _bar_template('Rental Term Distribution', 'Rental Term', 'count of listings',
+                                 text=[], texttemplate='%{text}%', textposition='outside')
+
+    availability = make_subplots(specs=[[{"secondary_y": True}]])
+    availability.add_trace(go.Bar(x=[], y=[], text=[], texttemplate='%{text}%', textposition='outside',
+                                  hoverinfo='name+x+y', name='Listings'), secondary_y=False)
+    availability.add_trace(go.Scatter(x=[], y=[], text=[], name='Earnings', mode='lines+markers', hoverinfo='text+name'),
+                           secondary_y=True)
+    availability.update_yaxes(title_text='count of listings', secondary_y=False)
+    availability.update_yaxes(title_text='Earnings per night in Dollars', secondary_y=True)
+    availability.update_xaxes(title_text='No. of Days booked in last 365 Days')
+    availability.update_layout(title_text='Last 365 Days availability and Average Earnings per night', margin=FIGURE_LAYOUT['margin'],
+                               title=FIGURE_LAYOUT['title'], paper_bgcolor='aliceblue', legend=dict(x=0.8, y=-0.4))
+
+    price_distribution = _bar_template('Price Distribution', 'Price in Dollars', 'count of listings',
+                                       text=[], texttemplate='%{text}%', textposition='outside')
+    area_price = _bar_template('Area-wise Median Price', 'Neighood Group', 'Price in Dollars')
+
+    sankey = go.Figure(go.Sankey(node=dict(pad=15, thickness=20, line=dict(color="black", width=0.5), label=[]),
+                                 link=dict(source=[], target=[], value=[])))
+    sankey.update_layout(title_text="Flow of listings to become Superhost-listings", font_size=12,
+                         margin=dict(l=20, r=20, t=30, b=20), title=dict(x=0.01, y=0.97), paper_bgcolor='aliceblue')
+
+    figures = {'room_type': room_type, 'term_rentals': term_rentals, 'availability': availability,
+               'price_distribution': price_distribution, 'area_price': area_price, 'sankey': sankey}
+    return {name: fig.to_dict() for name, fig in figures.items()}
+
+
+# figure dicts every graph of the page starts from, prebuilt by figure_templates() (`python charts.py`
+# rewrites the file), so startup neither imports plotly.graph_objects nor builds figures
+FIGURE_TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'figure_templates.json')
+try:
+    with open(FIGURE_TEMPLATES_PATH) as f:
+        FIGURE_TEMPLATES = json.load(f)
+except FileNotFoundError:
+    FIGURE_TEMPLATES = figure_templates()
+
+
+# write a figure update into a figure dict or a Dash Patch: nested dicts (and trace indices
+# under 'data') are followed key by key, any other value replaces what was there
+def apply_figure_update(figure, update):
+    for key, value in update.items():
+        if isinstance(value, dict):
+            if isinstance(figure, dict):
+                figure.setdefault(key, {})
+            apply_figure_update(figure[key], value)
+        else:
+            figure[key] = value
+    return figure
+
+
+# complete figure dict of a chart update, e.g. for exports outside of the page
+def full_figure(name, update):
+    return apply_figure_update(copy.deepcopy(FIGURE_TEMPLATES[name]), update)
+
+# format number 
+def format_number(number):
+    if number < 1000:
+        return str(round(number))
+    elif number < 1000000:
+        return f"{number / 1000:.1f}K"
+    else:
+        return f"{number / 1000000:.1f}M"
+
+
+def multiple_groups(selection):
+    return selection.counts_observed('neighbourhood_group').sum()>1
+
+
+# where the map opens for the selected listings
+def map_view(selection, map_coords):
+    if multiple_groups(selection):
+        zoom=10
+    else:
+        if selection.counts_observed('neighbourhood').sum()>1:
+            zoom=11
+        else:
+            zoom=14
+
+    if not len(map_coords):
+        return None
+    lat, lon = np.nanmedian(map_coords, axis=0)
+    return {'lat': float(lat), 'lon': float(lon), 'zoom': zoom}
+
+
+def general_stats(selection):
+    import dash_bootstrap_components as dbc
+    # Stats output
+    stats =  dbc.Row([html.H4("General Statistics", className="text-center"),
+             dbc.Col([html.H6(f"Total Listings", className="text-center"), html.P(f"{selection.total()}", className="text-center")]),
+             dbc.Col([html.H6(f"Average Price", className="text-center"), html.P(f"${selection.mean():.2f}", className="text-center")]),
+             dbc.Col([html.H6(f"Median Price", className="text-center"), html.P(f" ${selection.median():.2f}", className="text-center")])
+            ])
+    return stats
+
+
+def room_type_chart(selection):
+    # Room type distribution figure
+    room_type_counts = selection.counts('room_type')
+    room_type_fig = {'data': {0: {'labels': room_type_counts.index.tolist(), 'values': room_type_counts.tolist()}}}
+
+    pop_roomtype = room_type_counts.sort_values(ascending=False)
+    pop_roomtype = ' and '.join(list(pop_roomtype.index)[:2])
+    room_type_desc=html.Small([html.P(CHART_INFO['room_type']),
+                               html.P(f"[INSIGHTS] Most of the listings available are generally {pop_roomtype} in this area.")])
+    return room_type_fig, room_type_desc
+
+
+def term_rentals_chart(selection, term_type):
+    # term_rentals figure
+    if not term_type: 
+        term_rentals_df = selection.bin_stats('term_rentals')[['count']].reset_index()
+        term_rentals_df.columns=['Rental Term', 'count of listings']
+        plot_title = 'Rental Term Distribution'
+        text1="[ACTION]: Please Toggle 'Term of Rental' filter to see additional breakdown on Minimum number of nights"
+        text2=""
+        text3=""
+    elif term_type=="Short Term":
+        term_rentals_df = selection.bin_stats('minimum_nights_bin')[['count']].reset_index()
+        term_rentals_df = term_rentals_df[term_rentals_df['minimum_nights_bin'].isin(['<=5', '5-10', '10-15', '15-20', '20-25', '25-30'])]
+        term_rentals_df.columns=['Minimum Nights to book', 'count of listings']
+        plot_title='{} Rentals Distribution'.format(term_type).lstrip()
+        text1="[ACTION] Please Remove 'Term of Rental' filter to go back to seeing Overall Rental Term Distribution"
+        (pl1, pl2) = (list(term_rentals_df[term_rentals_df['Minimum Nights to book']=='<=5']['count of listings'])[0],
+                      term_rentals_df['Minimum Nights to book'][term_rentals_df['count of listings'].argmax()])
+        text2 = f"[INSIGHTS] {pl1} listings have <5 Minimum nights policy. Majorly Listings have {pl2} nights as Minimum nights policy"
+        text3 = CHART_INFO['short_term']
+    elif term_type=="Long Term":
+        term_rentals_df = selection.bin_stats('minimum_nights_bin')[['count']].reset_index()
+        term_rentals_df = term_rentals_df[~term_rentals_df['minimum_nights_bin'].isin(['<=5', '5-10', '10-15', '15-20', '20-25', '25-30'])]
+        term_rentals_df.columns=['Minimum Nights to book', 'count of listings']
+        plot_title='{} Term Rentals Distribution'.format(term_type).lstrip()
+        text1="[ACTION] Please Remove 'Term of Rental' filter to go back to seeing Overall Rental Term Distribution"
+        (pl1,pl2) = (list(term_rentals_df['Minimum Nights to book'])[term_rentals_df['count of listings'].argmax()],
+                    term_rentals_df[~term_rentals_df['Minimum Nights to book'].isin(['30-60', '60-90', '90-120', '120-150', '150-180'])]['count of listings'].sum())
+        text2 = f"[INSIGHTS] Majorly Listings have {pl1} nights as Minimum nights policy. {pl2} listings have more than 6m as Minimum nights Policy"
+        text3 = CHART_INFO['long_term']
+    term_rentals_df['Percentage']=((term_rentals_df['count of listings']/term_rentals_df['count of listings'].sum())*100).round(1)
+    term_rentals = {'data': {0: {'x': term_rentals_df.iloc[:, 0].tolist(), 'y': term_rentals_df.iloc[:, 1].tolist(),
+                                 'text': term_rentals_df['Percentage'].tolist()}},
+                    'layout': {'title': {'text': plot_title}, 'xaxis': {'title': {'text': term_rentals_df.columns[0]}}}}
+    
+    term_rentals_desc=html.Small([html.P(text1),
+                                  html.P(text2),
+                                  html.P(text3)])
+    return term_rentals, term_rentals_desc
+
+
+def availability_chart(selection, view_avg_total):
+    # listings, price and booked-night earnings per availability bin, all summed together (see bin_stats)
+    availability_stats = selection.bin_stats('last_1yr_availability')
+
+    # booking last 12m figure
+    last_12m_availability_df=availability_stats[['count']].reset_index()
+    last_12m_availability_df.columns=['No. of Days booked in last 365 Days', 'count of listings']
+    last_12m_availability_df['Percentage']=((last_12m_availability_df['count of listings']/last_12m_availability_df['count of listings'].sum())*100).round(1)
+    #last_12m_availability = px.bar(last_12m_availability_df, x=last_12m_availability_df.columns[0], y=last_12m_availability_df.columns[1], title='Last 365 Days availability', text=last_12m_availability_df['Percentage'])
+    #last_12m_availability.update_traces(texttemplate='%{text}%', textposition='outside')
+    #last_12m_availability.update_layout(font_size=12, margin=dict(l=20, r=20, t=40, b=20), title=dict(x=0.01, y=0.97), paper_bgcolor='aliceblue')
+
+    # Average Earnings based on last 12 Months availability
+    average_earnings_df=availability_stats[['average_price']].reset_index()
+    average_earnings_df.columns=['No. of Days booked in last 365 Days', 'Average Earnings in Dollars']
+
+    # Total Earnings 
+    total_earnings_df=availability_stats[['earnings']].reset_index()
+    total_earnings_df.columns=['No. of Days booked in last 365 Days', 'Total Earnings in Dollars']
+
+
+    # Dual axis figure for last_12m_availability and earnings, its traces and axes are in the template
+    earnings_text = [f'Average: {format_number(i)}, Total: {format_number(j)}' for i,j in zip(average_earnings_df['Average Earnings in Dollars'][1:], total_earnings_df['Total Earnings in Dollars'][1:])]
+    if view_avg_total=='Show Average Earnings':
+        earnings_df = average_earnings_df
+        earnings_title = 'Earnings per night in Dollars'
+        plot_title='Last 365 Days availability and Average Earnings per night'
+    elif view_avg_total=='Show Total Earnings':
+        earnings_df = total_earnings_df
+        earnings_title = 'Total Earnings in Dollars'
+        plot_title='Last 365 Days availability and Total Earnings'
+
+    last_12m_availability = {
+        'data': {0: {'x': last_12m_availability_df.iloc[:, 0].tolist(), 'y': last_12m_availability_df.iloc[:, 1].tolist(),
+                     'text': last_12m_availability_df['Percentage'].tolist()},
+                 1: {'x': earnings_df.iloc[1:, 0].tolist(), 'y': earnings_df.iloc[1:, 1].tolist(), 'text': earnings_text}},
+        'layout': {'title': {'text': plot_title}, 'yaxis2': {'title': {'text': earnings_title}}}}
+
+    last_12m_availability_desc=html.Small([html.P("[ACTION] Toggle filter below the chart to switch between viewing 'Average Earnings' and 'Total Earnings'. Total Earnings is actually overall earning of the cohort. Calculated by (Price_per_night)*(number_of_night_booked)"),
+                                            html.P("[ACTION] Check Average earnings per night for different cohorts by toggling filters."),
+                                            html.P(CHART_INFO['availability']),
+                                            ])
+    return last_12m_availability, last_12m_availability_desc
+
+
+# position of a price on the binned price axis (bin index), placed inside its bin when the bin is bounded
+def price_axis_position(price):
+    code = np.searchsorted(PRICE_BINS, price, side='left') - 1
+    lo, hi = PRICE_BINS[code], PRICE_BINS[code + 1]
+    if np.isinf(lo) or np.isinf(hi):
+        return float(code)
+    return code - 0.5 + (price - lo) / (hi - lo)
+
+
+def price_distribution_chart(selection):
+    #price distribution figure
+    price_distribution_df=selection.bin_stats('price_bin')[['count']].reset_index()
+    price_distribution_df.columns=['Price in Dollars', 'count of listings']
+    price_distribution_df['Percentage']=((price_distribution_df['count of listings']/price_distribution_df['count of listings'].sum())*100).round(1)
+
+    # percentile overlays (dotted vertical lines labelled at the top), merged from the cube like the medians
+    percentiles = selection.quantiles(PRICE_PERCENTILES).dropna()
+    shapes, annotations = [], []
+    for i, (q, price) in enumerate(percentiles.items()):
+        x = float(price_axis_position(price))
+        shapes.append({'type': 'line', 'x0': x, 'x1': x, 'xref': 'x', 'y0': 0, 'y1': 1, 'yref': 'y domain',
+                       'line': {'color': 'grey', 'dash': 'dot'}})
+        annotations.append({'text': f"p{round(q * 100)}", 'x': x, 'xref': 'x', 'y': 1, 'yref': 'y domain', 'showarrow': False,
+                            'xanchor': 'left' if i % 2 else 'right', 'yanchor': 'top'})
+    price_distribution = {'data': {0: {'x': price_distribution_df.iloc[:, 0].tolist(), 'y': price_distribution_df.iloc[:, 1].tolist(),
+                                       'text': price_distribution_df['Percentage'].tolist()}},
+                          'layout': {'shapes': shapes, 'annotations': annotations}}
+    if len(percentiles):
+        text1 = "[INSIGHTS] " + ", ".join(f"{round(q * 100)}% of listings cost up to ${price:.0f}" for q, price in percentiles.items()) + " per night."
+        relative_error = selection.cube.price_quantiles.relative_error
+        if relative_error:
+            text1 += f" (approximate, within {relative_error:.1%})"
+    else:
+        text1 = ""
+
+    price_distribution_desc=html.Small([html.P(text1),
+                                        html.P(CHART_INFO['price_distribution'])])
+    return price_distribution, price_distribution_desc
+
+
+def area_price_chart(selection, selected_neighbourhood):
+    nb_ls = selected_neighbourhood.split(' | ') if selected_neighbourhood else []
+    # Average Price based on Neighbourhood
+    if multiple_groups(selection):
+        top_nb_price_df=selection.median(by='neighbourhood_group').reset_index()
+        top_nb_price_df.columns=['Neighood Group','Price in Dollars']
+        text1="[ACTION] Select a neighbourhood group from 'Area' Filter to see median prices for areas in the Neighbourhood."
+    else:
+        top_nb_price_df=selection.median(by='neighbourhood').reset_index()
+        top_nb_price_df.columns=['Neighood Area','Price in Dollars']
+        if len(nb_ls)>1:
+            pl=nb_ls[0]
+            text1=f"""[ACTION] Select '{pl}' from 'Area' filter to switch back to comparing prices of all areas from {pl} neighbourhood"""
+        else:
+            text1=""
+
+    # stable, so areas with equal medians keep their order as in the browser charts
+    top_nb_price_df=top_nb_price_df.sort_values('Price in Dollars', ascending=True, kind='stable')
+    
+    top_nb_price = {'data': {0: {'x': top_nb_price_df.iloc[:, 0].tolist(), 'y': top_nb_price_df.iloc[:, 1].tolist()}},
+                    'layout': {'xaxis': {'title': {'text': top_nb_price_df.columns[0]}}}}
+
+    
+    top_nb_price_desc=html.Small([html.P(text1),
+                                  html.P(CHART_INFO['area_price'])])
+    return top_nb_price, top_nb_price_desc
+
+
+def sankey_chart(selection):
+    # flows of every layer at once, node indices are fixed by the engine
+    unique_nodes, sources, targets, values = selection.sankey_flows()
+
+    sankey_fig = {'data': {0: {'node': {'label': unique_nodes.tolist()},
+                               'link': {'source': sources.tolist(), 'target': targets.tolist(), 'value': values.tolist()}}}}
+    return sankey_fig
+
+
+# chart outputs as the dashboard callbacks build them: chart function and its extra arguments
+# from the filter control values (in the order of filter_inputs) and the earnings toggle
+CHART_STAGES = {
+    'stats': (general_stats, lambda values, view: ()),
+    'room_type': (room_type_chart, lambda values, view: ()),
+    'term_rentals': (term_rentals_chart, lambda values, view: (values[4],)),
+    'availability': (availability_chart, lambda values, view: (view,)),
+    'price_distribution': (price_distribution_chart, lambda values, view: ()),
+    'area_price': (area_price_chart, lambda values, view: (values[0],)),
+    'sankey': (sankey_chart, lambda values, view: ()),
+}
+EARNINGS_VIEWS = ['Show Average Earnings', 'Show Total Earnings']
+
+
+# Trend charts read one CubeSelection per stored snapshot, as (date, selection) pairs oldest first
+def trend_frame(points):
+    rows = []
+    for date, selection in points:
+        quantiles = selection.quantiles([0.25, 0.5, 0.75])
+        count = selection.total()
+        rows.append({'date': date, 'listings': count,
+                     'p25': quantiles[0.25], 'median': quantiles[0.5], 'p75': quantiles[0.75],
+                     'average_price': selection.mean(),
+                     'booked_days': selection.total('booked_nights') / count if count else np.nan})
+    return pd.DataFrame(rows, columns=['date', 'listings', 'p25', 'median', 'p75', 'average_price', 'booked_days'])
+
+
+def trend_charts(points):
+    # plotly is only needed here, it is imported on the first trends request rather than at startup
+    import plotly.express as px
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    trend_df = trend_frame(points)
+
+    # Listings and median price (with the p25-p75 band) per snapshot
+    price_trend = make_subplots(specs=[[{"secondary_y": True}]])
+    price_trend.add_trace(go.Bar(x=trend_df['date'], y=trend_df['listings'], name='Listings', opacity=0.4), secondary_y=False)
+    price_trend.add_trace(go.Scatter(x=trend_df['date'], y=trend_df['p75'], mode='lines', line=dict(width=0),
+                                     showlegend=False, hoverinfo='skip'), secondary_y=True)
+    price_trend.add_trace(go.Scatter(x=trend_df['date'], y=trend_df['p25'], mode='lines', line=dict(width=0),
+                                     fill='tonexty', fillcolor='rgba(99, 110, 250, 0.2)', name='p25-p75'), secondary_y=True)
+    price_trend.add_trace(go.Scatter(x=trend_df['date'], y=trend_df['median'], mode='lines+markers', name='Median Price'),
+                          secondary_y=True)
+    price_trend.update_yaxes(title_text='count of listings', secondary_y=False)
+    price_trend.update_yaxes(title_text='Price in Dollars', secondary_y=True)
+    price_trend.update_layout(title_text='Listings and Median Price over Time', font_size=12, margin=dict(l=20, r=20, t=40, b=20),
+                              title=dict(x=0.01, y=0.97), paper_bgcolor='aliceblue')
+
+    # Room type share per snapshot
+    room_type_df = pd.DataFrame({date: selection.counts('room_type') for date, selection in points}).T.fillna(0)
+    room_type_df = (room_type_df.div(room_type_df.sum(axis=1).replace(0, np.nan), axis=0) * 100).round(1)
+    room_type_df = room_type_df.rename_axis('date').reset_index().melt(id_vars='date', var_name='room_type',
+                                                                        value_name='Percentage of listings')
+    room_type_trend = px.area(room_type_df, x='date', y='Percentage of listings', color='room_type', title='Room Type Share over Time')
+    room_type_trend.update_layout(font_size=12, margin=dict(l=20, r=20, t=40, b=20), title=dict(x=0.01, y=0.97), paper_bgcolor='aliceblue')
+
+    # Average days booked in the last 365 days and average price per night
+    availability_trend = make_subplots(specs=[[{"secondary_y": True}]])
+    availability_trend.add_trace(go.Scatter(x=trend_df['date'], y=trend_df['booked_days'], mode='lines+markers',
+                                            name='Average days booked'), secondary_y=False)
+    availability_trend.add_trace(go.Scatter(x=trend_df['date'], y=trend_df['average_price'], mode='lines+markers',
+                                            name='Average price per night'), secondary_y=True)
+    availability_trend.update_yaxes(title_text='Days booked in last 365 Days', secondary_y=False)
+    availability_trend.update_yaxes(title_text='Price in Dollars', secondary_y=True)
+    availability_trend.update_layout(title_text='Bookings and Average Price over Time', font_size=12, margin=dict(l=20, r=20, t=40, b=20),
+                                     title=dict(x=0.01, y=0.97), paper_bgcolor='aliceblue')
+
+    if len(trend_df) > 1:
+        first, last = trend_df.iloc[0], trend_df.iloc[-1]
+        text1 = f"[INSIGHTS] From {first['date']} to {last['date']} the listings went from {first['listings']} to {last['listings']} \
+                  and the median price from ${first['median']:.0f} to ${last['median']:.0f} per night."
+    elif len(trend_df):
+        text1 = f"[ACTION] Only the {trend_df['date'].iloc[0]} snapshot is stored, add more snapshots to see trends."
+    else:
+        text1 = "[ACTION] No snapshots are stored yet. Add monthly listings files with `python trend_store.py trends <date> <listings.csv>`."
+    text2 = "[INFO] Trends are computed from pre-aggregated monthly snapshots of the listings and follow the filters of the dashboard."
+    relative_error = points[0][1].cube.price_quantiles.relative_error if points else None
+    if relative_error:
+        text2 += f" Median prices are within {relative_error:.1%} of the exact values."
+    trend_desc = html.Small([html.P(text1),
+                             html.P(text2)])
+    return price_trend, room_type_trend, availability_trend, trend_desc
+
+
+# rewrite the prebuilt figure templates after changing figure_templates()
+if __name__ == '__main__':
+    with open(FIGURE_TEMPLATES_PATH, 'w') as f:
+        json.dump(figure_templates(), f, indent=1)
@@ -0,0 +1,93 @@
+import gzip
+import hashlib
+import json
+import struct
+
+import numpy as np
+
+from charts import CHART_INFO, PRICE_PERCENTILES
+from features import PRICE_BINS
+
+# cube dimensions the browser filters and groups by in client filtering mode
+CLIENT_DIMS = ['neighbourhood_group', 'neighbourhood', 'host_is_superhost', 'room_type', 'price_bin',
+               'term_rentals', 'reviewed']
+# typed arrays of the payload: non-negative whole numbers (prices and their sums usually are) in the
+# narrowest unsigned type that holds them exactly, other integers as int32, everything else as float64
+UNSIGNED_TYPES = [np.uint8, np.uint16, np.uint32]
+
+
+def array_dtype(values):
+    if values.dtype == bool:
+        return np.dtype(np.uint8)
+    integer = np.issubdtype(values.dtype, np.integer)
+    if not len(values):
+        return np.dtype('<i4' if integer else '<f8')
+    lo, hi = values.min(), values.max()
+    whole = integer or bool(np.isfinite(lo) and np.isfinite(hi) and np.all(values == np.floor(values)))
+    if whole and lo >= 0 and hi <= np.iinfo(np.uint32).max:
+        return np.dtype(next(dtype for dtype in UNSIGNED_TYPES if hi <= np.iinfo(dtype).max)).newbyteorder('<')
+    if integer and np.iinfo(np.int32).min <= lo and hi <= np.iinfo(np.int32).max:
+        return np.dtype('<i4')
+    return np.dtype('<f8')
+
+
+class BinaryPayload:
+    """JSON header followed by little-endian typed arrays, read by assets/client_charts.js.
+
+    `add` stores an array and returns its descriptor for the header; every array
+    starts at a multiple of 8 bytes so the browser can view it without copying.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def add(self, values):
+        values = np.asarray(values)
+        dtype = array_dtype(values)
+        data = np.ascontiguousarray(values, dtype=dtype).tobytes()
+        descriptor = {'dtype': dtype.name, 'offset': self.size, 'length': len(values)}
+        padding = -len(data) % 8
+        self.chunks.append(data + b'\0' * padding)
+        self.size += len(data) + padding
+        return descriptor
+
+    # 4-byte header length, the header padded to 8 bytes, then the arrays
+    def encode(self, header):
+        text = json.dumps(header, default=lambda value: value.item()).encode()
+        text += b' ' * (-(len(text) + 4) % 8)
+        return struct.pack('<I', len(text)) + text + b''.join(self.chunks)
+
+
+# per-cell histogram as its non-zero (cell, bin) entries and the measures of each
+def sparse_histogram(payload, measures):
+    nonzero = np.nonzero(np.any([matrix != 0 for matrix in measures.values()], axis=0))
+    return {'cells': payload.add(nonzero[0]), 'bins': payload.add(nonzero[1]),
+            'measures': {name: payload.add(matrix[nonzero]) for name, matrix in measures.items()}}
+
+
+# the cells of a FilterCube in the binary form read by assets/client_charts.js
+def cube_snapshot(cube):
+    payload = BinaryPayload()
+    quantiles = cube.price_quantiles
+    header = {
+        'n_cells': cube.n_cells,
+        'dims': {dim: {'labels': cube.labels[dim], 'binned': cube.binned[dim], 'codes': payload.add(cube.cell_codes[dim])}
+                 for dim in CLIENT_DIMS},
+        'cells': {name: payload.add(values) for name, values in cube.cells.items()},
+        'histograms': {dim: {'labels': cube.hist_labels[dim], **sparse_histogram(payload, measures)}
+                       for dim, measures in cube.histograms.items()},
+        'quantiles': {'values': payload.add(quantiles.values), 'cells': payload.add(quantiles.cells),
+                      'codes': payload.add(quantiles.codes), 'counts': payload.add(quantiles.counts),
+                      'relative_error': quantiles.relative_error},
+        'price_bins': payload.add(PRICE_BINS),
+        'price_percentiles': PRICE_PERCENTILES,
+        'info': CHART_INFO,
+    }
+    return payload.encode(header)
+
+
+# gzipped cube snapshot and its ETag
+def compressed_snapshot(cube):
+    body = gzip.compress(cube_snapshot(cube))
+    return body, hashlib.sha1(body).hexdigest()
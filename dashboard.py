@@ -1,50 +1,96 @@
-from dash import dcc, html, Input, Output, State, dash_table
+import time
+# startup breakdown in seconds (printed, in /ready and the startup_seconds gauges), measured from here
+startup_clock = time.perf_counter()
+from dash import dcc, html, Input, Output, State, Patch, ClientsideFunction
+from dash.exceptions import PreventUpdate
+from flask import request, jsonify, g
 import dash_bootstrap_components as dbc
 import dash
-import pandas as pd
-import numpy as np
-import folium
-from folium.plugins import FastMarkerCluster
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.express as px
-
-# format number 
-def format_number(number):
-    if number < 1000:
-        return str(round(number))
-    elif number < 1000000:
-        return f"{number / 1000:.1f}K"
-    else:
-        return f"{number / 1000000:.1f}M"
-
-# Load your data
-listings_df = pd.read_csv('listings.csv')
-
-# create binned columns
-listings_df['minimum_nights_bin']=pd.cut(listings_df['minimum_nights'], 
-                                        bins=[-np.inf,5,10,15,20,25,30,60, 90, 120, 150, 180, 210, 240, 270, 300, 330, np.inf],
-                                        labels=['<=5', '5-10', '10-15', '15-20', '20-25', '25-30', 
-                                                '30-60', '60-90', '90-120', '120-150', '150-180', 
-                                                '180-210', '210-240', '240-270', '270-300', '300-330', '>330'])
-
-listings_df['price_bin']=pd.cut(listings_df['price'], 
-                                        bins=(-np.inf, 100, 150, 200, 250, 300, 350, 400, 500, 600, 700, 800, 900, 1000,  np.inf), 
-                                        labels=['<100', '100-150', '150-200', '200-250', '250-300', '300-350', 
-                                                '350-400', '400-500', '500-600', '600-700', '700-800', '800-900', '900-1000', '>1000'])
-
-listings_df['last_1yr_availability']=pd.cut(365-listings_df['availability_365'], 
-                                        bins=[-np.inf, 0, 31, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330, np.inf], 
-                                        labels=['0','1-30', '30-60', '60-90', '90-120', '120-150', '150-180', '180-210', 
-                                                '210-240', '240-270', '270-300', '300-330', '>330'])
-
-listings_df['term_rentals']=listings_df['minimum_nights'].apply(lambda x: "Short Term" if x<=30 else "Long Term" if x>30 else x)
-
+import os
+import json
+import gzip
+import atexit
+import uuid
+import hmac
+import threading
+from urllib.parse import quote
+from filters import parse_filters, filter_key, filters_from_json
+from figure_cache import FigureCache
+from features import PRICE_LABELS
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from chart_pool import ChartPool, ChartScheduler
+from datasets import DatasetCatalog
+from trend_store import TrendStore
+from metrics import metrics, profiler, BYTES_BUCKETS
+from warmup import warmup_plan, run_warmup, print_report
+from charts import (general_stats, room_type_chart, term_rentals_chart, availability_chart,
+                    price_distribution_chart, area_price_chart, sankey_chart, trend_charts,
+                    FIGURE_TEMPLATES, CHART_STAGES, EARNINGS_VIEWS, apply_figure_update)
+from plotly.io.json import to_json_plotly
+
+startup_seconds = {'imports': time.perf_counter() - startup_clock}
+
+# price medians/percentiles are exact unless PRICE_QUANTILE_ERROR sets a relative error, e.g. 0.01
+price_quantile_error = float(os.environ['PRICE_QUANTILE_ERROR']) if os.environ.get('PRICE_QUANTILE_ERROR') else None
+
+# with CHART_WORKERS set, charts are built concurrently in worker processes sharing one copy of the cube
+chart_workers = int(os.environ.get('CHART_WORKERS', 0))
+
+# listings snapshots the dashboard can serve; by default just listings.csv, or the entries of the
+# DATASET_CATALOG json file, of which the first is active at startup. Every snapshot is loaded from
+# its columnar store written by `python data_store.py` when available
+catalog = DatasetCatalog(memory_budget=int(os.environ['DATASET_MEMORY_BUDGET']) if os.environ.get('DATASET_MEMORY_BUDGET') else None,
+                         relative_error=price_quantile_error, share=chart_workers > 0)
+if os.environ.get('DATASET_CATALOG'):
+    dataset_names = catalog.register_file(os.environ['DATASET_CATALOG'])
+else:
+    catalog.register('listings', 'listings.csv')
+    dataset_names = ['listings']
+
+# with FAST_STARTUP set, the layout is served right away and the first dataset is built in the background;
+# the dropdown options arrive with the first callback and data requests wait (up to STARTUP_WAIT seconds)
+# until the dataset is ready, see /ready
+fast_startup = bool(os.environ.get('FAST_STARTUP'))
+startup_wait = float(os.environ.get('STARTUP_WAIT', 60))
+dataset_ready = threading.Event()
+
+def load_dataset():
+    start = time.perf_counter()
+    catalog.activate(dataset_names[0])
+    startup_seconds['dataset'] = time.perf_counter() - start
+
+def mark_ready():
+    startup_seconds['ready'] = time.perf_counter() - startup_clock
+    dataset_ready.set()
+    print('startup: ' + ', '.join(f'{phase} {seconds:.2f} s' for phase, seconds in startup_seconds.items()))
+
+if not fast_startup:
+    load_dataset()
+
+# with CLIENT_FILTERING set, the stats and the room type, term, availability, price and area charts are
+# computed in the browser from a copy of the cube (assets/client_charts.js); the server answers the map and Sankey
+client_filtering = bool(os.environ.get('CLIENT_FILTERING'))
+
+chart_pool = ChartPool(chart_workers) if chart_workers > 0 else None
+if chart_pool is not None:
+    atexit.register(chart_pool.close)
+# without worker processes, charts are built on CHART_THREADS threads (default one per core) instead of
+# the request threads, so a burst of requests queues there and superseded ones are dropped before they start
+chart_threads = ThreadPoolExecutor(int(os.environ.get('CHART_THREADS', os.cpu_count() or 1))) if chart_pool is None else None
+chart_scheduler = ChartScheduler()
+
+# pre-aggregated monthly snapshots for the trend charts, filled with `python trend_store.py`
+trend_store = TrendStore(os.environ.get('TREND_STORE', 'trends'))
+
+# chart outputs cached per normalised filter state, optionally kept on disk across restarts
+figure_cache = FigureCache(max_bytes=int(os.environ.get('FIGURE_CACHE_MAX_BYTES', 256 * 1024 * 1024)),
+                           path=os.environ.get('FIGURE_CACHE_PATH'))
+figure_cache.load()
+atexit.register(figure_cache.save)
+
+layout_start = time.perf_counter()
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 
-# Assuming neighbourhoods_df has a 'group' column that we'll use for the neighbourhood-group dropdown
-neighbourhood_dropdown_options = [nb for nb in np.sort(listings_df['neighbourhood_group'].unique())]+\
-                                 [nb for nb in np.sort((listings_df['neighbourhood_group']+' | '+listings_df['neighbourhood']).unique())]
 
 app.layout = html.Div([
     dbc.Container(fluid=True, children=[
@@ -53,7 +99,8 @@ app.layout = html.Div([
             dbc.Col(html.H1("New York City Airbnb Dashboard", className="mb-2"), width="auto",className="col-7 "),
             dbc.Col( dbc.Row([
                 dbc.Button("About Dashboard", id="open-info-1", color="primary", className="w-auto m-2"),
-                dbc.Button("How to Use this Dashboard", id="open-info-2", color="primary", className="w-auto m-2")
+                dbc.Button("How to Use this Dashboard", id="open-info-2", color="primary", className="w-auto m-2"),
+                dbc.Button("Trends", id="open-trends", color="primary", className="w-auto m-2")
             ],className="justify-content-end"), width="auto",className="col-5")
         ], align="center", className="w-100"),
         dbc.Modal(
@@ -103,6 +150,23 @@ app.layout = html.Div([
             id="modal-info-2",
             is_open=False,  # True to show the modal; False to hide it
         ),
+        dbc.Modal(
+            [
+                dbc.ModalHeader(dbc.ModalTitle("Trends over Monthly Snapshots")),
+                dbc.ModalBody([
+                    dcc.Graph(id='trend-price', className="mb-2"),
+                    dcc.Graph(id='trend-room-type', className="mb-2"),
+                    dcc.Graph(id='trend-availability', className="mb-2"),
+                    html.Div(id='trend-description', className="mb-2"),
+                ]),
+                dbc.ModalFooter(
+                    dbc.Button("Close", id="close-trends", className="ml-auto")
+                ),
+            ],
+            id="modal-trends",
+            is_open=False,
+            size="lg",
+        ),
         dbc.Row([dbc.Col(html.Small("Select Area"), className="mb-2"),
                  dbc.Col(html.Small("Check only Superhost listings"), className="mb-2"),
                  dbc.Col(html.Small("listing type"), className="mb-2"),
@@ -112,7 +176,7 @@ app.layout = html.Div([
                  ]),
         dbc.Row([dbc.Col(dcc.Dropdown(
             id='neighbourhood-dropdown',
-            options=[{'label': nb, 'value': nb} for nb in neighbourhood_dropdown_options],
+            options=[{'label': nb, 'value': nb} for nb in catalog.active.neighbourhood_options] if catalog.active else [],
             value=None,  # default value
             multi=False,
             className="mb-2")),
@@ -126,15 +190,14 @@ app.layout = html.Div([
 
             dbc.Col(dcc.Dropdown(
             id='select-listing-type',
-            options=list(listings_df['room_type'].unique()),
+            options=catalog.active.room_type_options if catalog.active else [],
             value=None,  # default value
             multi=True,
             className="mb-2")), 
             
             dbc.Col(dcc.Dropdown(
             id='select-price',
-            options=['<100', '100-150', '150-200', '200-250', '250-300', '300-350', '350-400', '400-500', '500-600', 
-                     '600-700', '700-800', '800-900', '900-1000', '>1000'],
+            options=PRICE_LABELS,
             value=None,  # default value
             multi=True,
             className="mb-2")),
@@ -158,17 +221,17 @@ app.layout = html.Div([
             dbc.Col([
                 dbc.Card([dbc.CardBody([html.Div(id='stats-output', className="mb-2")])], className="mb-4"),
                 dbc.Card([dbc.CardBody([
-                dcc.Graph(id='room-type-distribution', className="mb-2"),
+                dcc.Graph(id='room-type-distribution', figure=FIGURE_TEMPLATES['room_type'], className="mb-2"),
                 html.Div(id='room-type-description', className="mb-2"),
                 ])], className="mb-4"),
                 
                 dbc.Card([dbc.CardBody([
-                dcc.Graph(id='term_rentals', className="mb-2"),
+                dcc.Graph(id='term_rentals', figure=FIGURE_TEMPLATES['term_rentals'], className="mb-2"),
                 html.Div(id='term-rentals-description', className="mb-2"),
                 ])], className="mb-4"),
 
                 dbc.Card([dbc.CardBody([
-                dcc.Graph(id='last_12m_availability', className="mb-2"),
+                dcc.Graph(id='last_12m_availability', figure=FIGURE_TEMPLATES['availability'], className="mb-2"),
                 dbc.Row([dbc.Row(html.Small(html.Mark("Toggle View")), className="mb-2"),
                          dcc.Dropdown(id='select-average-or-total', 
                                       options=['Show Average Earnings', 'Show Total Earnings'],
@@ -179,19 +242,19 @@ app.layout = html.Div([
                 ])], className="mb-4"),
 
                 dbc.Card([dbc.CardBody([
-                dcc.Graph(id='price_distribution', className="mb-2"),
+                dcc.Graph(id='price_distribution', figure=FIGURE_TEMPLATES['price_distribution'], className="mb-2"),
                 html.Div(id='price-distribution-description', className="mb-2"),
                 ])], className="mb-4"),
 
                 dbc.Card([dbc.CardBody([
-                dcc.Graph(id='top_np_price', className="mb-2"),
+                dcc.Graph(id='top_np_price', figure=FIGURE_TEMPLATES['area_price'], className="mb-2"),
                 html.Div(id='top-nb-price-description', className="mb-2"),
                 ])], className="mb-4")
                 # ... potentially other components ...
             ], width=5, style={'maxHeight': '80vh', 'overflowY': 'scroll', 'paddingRight': 5}),
             dbc.Col( [
                      html.Div(id='sankey-clickable-wrapper', children=[html.Small(html.Mark("Click to view chart info"))], style={'text-align': 'left', 'width':'20%'}),
-                     dcc.Graph(id='sankey-graph', style={'height':'35%', 'padding':'0'}), #dbc.Row(sankey_graph, style={'height':'35%'})
+                     dcc.Graph(id='sankey-graph', figure=FIGURE_TEMPLATES['sankey'], style={'height':'35%', 'padding':'0'}), #dbc.Row(sankey_graph, style={'height':'35%'})
                      dbc.Modal([dbc.ModalBody(
                                               [dcc.Graph(id='sankey-chart-modal'),
                                                html.Small([html.P("   "),
@@ -217,13 +280,40 @@ app.layout = html.Div([
                                              ),
                                 dbc.ModalFooter(dbc.Button("Close", id="close-sankey-modal", className="ml-auto"))
                                 ],id="modal-sankey",is_open=False,size="lg",),
-                     dbc.Row(html.Iframe(id='map', srcDoc=None, width='100%'),style={ "height":'47%'}),
+                     dbc.Row(html.Iframe(id='map', src=app.get_asset_url('map.html'), width='100%', style={'height': '100%'}),style={ "height":'47%'}),
                     ], 
                     width=7, style={'height': '100vh','position':'fixed', 'top': '130px', 'right': 0, })
         ], className='g-0'),  # Remove gutters between columns
-    ], style={'maxWidth': '100%'})
+    ], style={'maxWidth': '100%'}),
+    dcc.Store(id='session-id')
 ], style={'height': '100vh', 'overflowY': 'hidden'})  # Set the overall layout height and hide overflow
 
+# the layout never changes, it is serialized once instead of on every page load
+layout_snapshot = to_json_plotly(app.layout)
+startup_seconds['layout'] = time.perf_counter() - layout_start
+
+@app.server.before_request
+def serve_layout_snapshot():
+    if request.path == app.config.routes_pathname_prefix + '_dash-layout':
+        return app.server.response_class(layout_snapshot, mimetype='application/json')
+
+# the dataset is built after the chart workers are forked and the layout is ready
+startup_error = None
+
+def load_in_background():
+    global startup_error
+    try:
+        load_dataset()
+    except Exception as error:
+        startup_error = repr(error)
+        raise
+    mark_ready()
+
+if fast_startup:
+    threading.Thread(target=load_in_background, name='load-dataset', daemon=True).start()
+else:
+    mark_ready()
+
 # Callback to open the modal
 @app.callback(
     Output("modal-sankey", "is_open"),
@@ -256,383 +346,356 @@ def toggle_modal_1(n1, n2, is_open):
         return not is_open
     return is_open
 
-@app.callback(
-    [Output('map', 'srcDoc'), 
-     Output('room-type-distribution', 'figure'), 
-     Output('stats-output', 'children'), 
-     Output('term_rentals', 'figure'), 
-     Output('last_12m_availability', 'figure'), 
-     Output('price_distribution', 'figure'),
-     Output('top_np_price', 'figure'),
-     
-     Output('room-type-description', 'children'),
-     Output('term-rentals-description', 'children'),
-     Output('12m-availability-description', 'children'),
-     Output('price-distribution-description', 'children'),
-     Output('top-nb-price-description', 'children'),
-
-     Output('sankey-graph', 'figure'),
-     Output('sankey-chart-modal', 'figure')
-     ],
-
-    [Input('neighbourhood-dropdown', 'value'), 
-     Input('check-superhost-only', 'value'),
-     Input('select-listing-type', 'value'),
-     Input('select-price', 'value'),
-     Input('select-term', 'value'),
-     Input('select-reviewed-listings', 'value'),
-     Input('select-average-or-total', 'value')
-     ]
-)
-def update_charts(selected_neighbourhood, check_super_host, listing_type, price_type, term_type,reviewed_listings, view_avg_total):
-    if selected_neighbourhood:
-        nb_ls = selected_neighbourhood.split(' | ')
-        if len(nb_ls)>1:
-            filtered_df = listings_df[(listings_df['neighbourhood_group']==nb_ls[0]) & (listings_df['neighbourhood']==nb_ls[1])]
-        else:
-            filtered_df = listings_df[(listings_df['neighbourhood_group']==nb_ls[0])]
-    else:
-        filtered_df=listings_df.copy()
-
-    if check_super_host=='Yes':
-        filtered_df=filtered_df[filtered_df['host_is_superhost']=='t']
-    else:
-        None
-    
-    if listing_type:
-        filtered_df=filtered_df[filtered_df['room_type'].isin(listing_type)]
-    else:
-        None
-
-    if price_type:
-        filtered_df=filtered_df[filtered_df['price_bin'].isin(price_type)]
+filter_inputs = [Input('neighbourhood-dropdown', 'value'), 
+                 Input('check-superhost-only', 'value'),
+                 Input('select-listing-type', 'value'),
+                 Input('select-price', 'value'),
+                 Input('select-term', 'value'),
+                 Input('select-reviewed-listings', 'value')]
+
+# id of the browser session, used to keep its last selection for incremental updates
+@app.callback(Output('session-id', 'data'), Input('session-id', 'data'))
+def init_session(session_id):
+    if session_id:
+        raise PreventUpdate
+    return uuid.uuid4().hex
+
+# build a chart from the filter control values (in the order of filter_inputs), or reuse the
+# cached output for an equivalent filter state; `args` are chart-specific inputs passed after the selection
+def cached_chart(name, filter_values, session_id, chart, *args):
+    # the dataset is picked once, a swap during the request does not mix two snapshots
+    dataset = catalog.active
+    filters = parse_filters(*filter_values)
+
+    def build_here():
+        # listings in/out of every filter step, recorded once per filter change by the callback that
+        # computes the selection (like for the map view); the other charts share it
+        trace = []
+        with metrics.span('selection', chart=name):
+            selection = dataset.aggregator.selection(session_id, filters, trace)
+        for column, rows_in, rows_out in trace:
+            metrics.inc('filter_rows_in', rows_in, column=column, chart='selection')
+            metrics.inc('filter_rows_out', rows_out, column=column, chart='selection')
+        with metrics.span('chart_build', chart=name):
+            return chart(selection, *args)
+
+    def submit():
+        if chart_pool is not None:
+            return chart_pool.submit(dataset.snapshot, chart, filters, session_id, *args)
+        return chart_threads.submit(build_here)
+
+    # a newer request of the session for this chart cancels this build if it is still queued
+    def build():
+        with metrics.span('chart_queued', chart=name):
+            return chart_scheduler.run((session_id, name) if session_id else None, submit)
+
+    # identical filter states requested at the same time are built once, see FigureCache;
+    # outputs with approximate quantiles are kept apart from exact ones in a saved cache
+    with metrics.span('chart', chart=name):
+        try:
+            return figure_cache.get_or_compute((name, dataset.key, filter_key(filters), price_quantile_error) + args, build)
+        except CancelledError:
+            metrics.inc('superseded_requests', chart=name)
+            raise PreventUpdate
+
+# every server-side chart output of one filter state, through the same cache keys as the callbacks
+def warm_filter_state(filter_values):
+    for name, (chart, extra) in CHART_STAGES.items():
+        if client_filtering and name != 'sankey':
+            continue
+        for view in EARNINGS_VIEWS if name == 'availability' else EARNINGS_VIEWS[:1]:
+            cached_chart(name, filter_values, None, chart, *extra(filter_values, view))
+
+# with WARMUP set, the charts of the dropdown filter space (see warmup.py) are precomputed in the
+# background after startup, the most requested first when FILTER_LOG holds a recording;
+# WARMUP_LIMIT caps the number of filter states. `python warmup.py` does the same offline
+warmup_report = {}
+
+def background_warmup():
+    dataset_ready.wait()
+    log_path = os.environ.get('FILTER_LOG')
+    plan, weights = warmup_plan(catalog.active.neighbourhood_options,
+                                log_path if log_path and os.path.exists(log_path) else None,
+                                int(os.environ['WARMUP_LIMIT']) if os.environ.get('WARMUP_LIMIT') else None)
+    warmup_report.update(run_warmup(plan, weights, warm_filter_state))
+    print_report(warmup_report)
+    figure_cache.save()
+
+if os.environ.get('WARMUP'):
+    threading.Thread(target=background_warmup, name='warmup', daemon=True).start()
+
+# Every chart has its own callback so it only recomputes when its own inputs change
+# the map page is loaded once; a new filter only changes the url fragment, which makes the
+# page query the /map endpoints again instead of reloading
+# chart figures start from their templates in the layout, callbacks only send the data that changed
+def figure_patch(update):
+    return apply_figure_update(Patch(), update)
+
+@app.callback(Output('map', 'src'), filter_inputs)
+def update_map(*filter_values):
+    # with FILTER_LOG set every filter change is appended as a json line, a mix `benchmark.py` can replay
+    if os.environ.get('FILTER_LOG'):
+        with open(os.environ['FILTER_LOG'], 'a') as f:
+            f.write(json.dumps(filter_values) + '\n')
+    return app.get_asset_url('map.html') + '#' + quote(json.dumps(parse_filters(*filter_values)))
+
+def map_filters(dataset):
+    return filters_from_json(request.args.get('filters'), dataset.bitmaps.bitmaps)
+
+def map_bbox():
+    bbox = [float(v) for v in request.args['bbox'].split(',')]
+    if len(bbox) != 4:
+        raise ValueError(bbox)
+    return bbox
+
+@app.server.route(app.config.routes_pathname_prefix + 'map/view')
+def map_view_endpoint():
+    dataset = catalog.active
+    # rows in/out of every filter step, the map view is queried once per filter change
+    trace = []
+    with metrics.span('map_view'):
+        view = dataset.map_view(map_filters(dataset), trace)
+    for column, rows_in, rows_out in trace:
+        metrics.inc('filter_rows_in', rows_in, column=column, chart='map_view')
+        metrics.inc('filter_rows_out', rows_out, column=column, chart='map_view')
+    return jsonify(view)
+
+@app.server.route(app.config.routes_pathname_prefix + 'map/clusters')
+def map_clusters_endpoint():
+    try:
+        zoom = int(request.args['zoom'])
+        bbox = map_bbox()
+    except (KeyError, ValueError):
+        return jsonify({'error': 'zoom and bbox=west,south,east,north are required'}), 400
+    dataset = catalog.active
+    with metrics.span('map_clusters'):
+        return jsonify(dataset.map_clusters(map_filters(dataset), zoom, bbox))
+
+# count, median price/location and a sample of the filtered listings in a viewport
+@app.server.route(app.config.routes_pathname_prefix + 'map/stats')
+def map_stats_endpoint():
+    try:
+        bbox = map_bbox()
+    except (KeyError, ValueError):
+        return jsonify({'error': 'bbox=west,south,east,north is required'}), 400
+    dataset = catalog.active
+    with metrics.span('map_stats'):
+        return jsonify(dataset.map_stats(map_filters(dataset), bbox))
+
+# admin endpoints require ADMIN_TOKEN as a bearer token
+def is_admin():
+    token = os.environ.get('ADMIN_TOKEN')
+    return bool(token) and hmac.compare_digest(request.headers.get('Authorization', '').encode(),
+                                             f'Bearer {token}'.encode())
+
+# registered snapshots and which one is active; their file paths (also in build errors) only for admins
+@app.server.route('/datasets')
+def datasets_endpoint():
+    status = catalog.status()
+    if not is_admin():
+        for info in status['datasets'].values():
+            for key in ('csv', 'store', 'error'):
+                del info[key]
+    return jsonify(status)
+
+# register (json body {"csv": ..., "store": ...}) and/or activate a snapshot; it is built in the
+# background and swapped in when ready
+@app.server.route('/datasets/<name>/activate', methods=['POST'])
+def activate_dataset_endpoint(name):
+    if not is_admin():
+        return jsonify({'error': 'forbidden'}), 403
+    body = request.get_json(silent=True) or {}
+    if 'csv' in body:
+        catalog.register(name, body['csv'], body.get('store'))
+    try:
+        started = catalog.activate_in_background(name)
+    except KeyError:
+        return jsonify({'error': f'unknown dataset {name}'}), 404
+    return jsonify({'building': started, **catalog.status()}), 202
+
+# time every Dash callback request and record the size of the serialized response it returns
+@app.server.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+# requests that read the dataset wait for it while it is built at startup (FAST_STARTUP)
+@app.server.before_request
+def wait_for_dataset():
+    data_paths = (app.config.routes_pathname_prefix + 'map/', app.config.routes_pathname_prefix + 'client/')
+    if (request.path.endswith('/_dash-update-component') or request.path.startswith(data_paths)) \
+            and not dataset_ready.wait(startup_wait):
+        return jsonify({'error': 'starting', 'detail': startup_error}), 503, {'Retry-After': '5'}
+
+# readiness probe for load balancers and autoscalers: 503 until the first dataset is ready
+@app.server.route('/ready')
+def ready_endpoint():
+    ready = dataset_ready.is_set()
+    return jsonify({'ready': ready, 'dataset': catalog.active.name if ready else None, 'error': startup_error,
+                    'startup_seconds': startup_seconds}), 200 if ready else 503
+
+@app.server.after_request
+def record_callback_metrics(response):
+    if request.path.endswith('/_dash-update-component'):
+        output = (request.get_json(silent=True) or {}).get('output', '')
+        metrics.observe('span_seconds', time.perf_counter() - g.request_start, span='callback', output=output)
+        # size of the serialized response as sent, per callback (its outputs together)
+        if response.status_code == 200 and not response.direct_passthrough:
+            metrics.observe('output_bytes', response.calculate_content_length() or 0, BYTES_BUCKETS, output=output)
+    return response
+
+def dashboard_gauges():
+    dataset = catalog.active
+    gauges = [(f'figure_cache_{name}', {}, value) for name, value in figure_cache.stats().items()]
+    gauges += [('startup_seconds', {'phase': phase}, seconds) for phase, seconds in startup_seconds.items()]
+    if dataset is not None:
+        gauges += [('aggregator_delta_updates', {'dataset': dataset.name}, dataset.aggregator.delta_updates),
+                   ('aggregator_full_updates', {'dataset': dataset.name}, dataset.aggregator.full_updates)]
+    # active flag and memory from one snapshot of the catalog, an activation may finish meanwhile
+    status = catalog.status()
+    gauges += [('dataset_memory_bytes', {'dataset': name, 'active': str(name == status['active']).lower()},
+                info['memory'])
+               for name, info in status['datasets'].items() if info['memory'] is not None]
+    gauges.append(('chart_builds_cancelled', {}, chart_scheduler.cancelled))
+    gauges.append(('profiler_running', {}, int(profiler.running.is_set())))
+    gauges += [(f'warmup_{name}', {}, value) for name, value in warmup_report.items()]
+    return gauges
+
+metrics.register_gauges(dashboard_gauges)
+
+# Prometheus text format: spans, per-filter rows in/out, Output sizes, cache and aggregator counters
+@app.server.route('/metrics')
+def metrics_endpoint():
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+# sampling profiler of the request threads, stop returns the collapsed stacks for a flame graph
+@app.server.route('/profiler/start', methods=['POST'])
+def profiler_start_endpoint():
+    if not is_admin():
+        return jsonify({'error': 'forbidden'}), 403
+    return jsonify({'started': profiler.start(float(request.args.get('interval', 0.005)))})
+
+@app.server.route('/profiler/stop', methods=['POST'])
+def profiler_stop_endpoint():
+    if not is_admin():
+        return jsonify({'error': 'forbidden'}), 403
+    return profiler.stop(), 200, {'Content-Type': 'text/plain'}
+
+# cube cells of the active dataset for client filtering mode, the browser revalidates its copy by ETag
+@app.server.route(app.config.routes_pathname_prefix + 'client/cube')
+def client_cube_endpoint():
+    body, etag = catalog.active.client_cube()
+    if etag in request.if_none_match:
+        return '', 304, {'ETag': f'"{etag}"'}
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache', 'Content-Type': 'application/octet-stream',
+               'Vary': 'Accept-Encoding'}
+    if 'gzip' in request.accept_encodings:
+        headers['Content-Encoding'] = 'gzip'
     else:
-        None
+        body = gzip.decompress(body)
+    return body, 200, headers
+
+# dropdown options of the active dataset, refreshed on every page load
+@app.callback([Output('neighbourhood-dropdown', 'options'), Output('select-listing-type', 'options')],
+              Input('session-id', 'data'))
+def update_dropdown_options(session_id):
+    if not session_id:
+        raise PreventUpdate
+    dataset = catalog.active
+    return [{'label': nb, 'value': nb} for nb in dataset.neighbourhood_options], dataset.room_type_options
+
+# the charts computed in the browser in client filtering mode only have server callbacks otherwise
+def chart_callback(*dependencies):
+    def register(callback):
+        if not client_filtering:
+            app.callback(*dependencies)(callback)
+        return callback
+    return register
+
+@chart_callback(Output('stats-output', 'children'), filter_inputs, State('session-id', 'data'))
+def update_stats(*filter_values):
+    *filter_values, session_id = filter_values
+    return cached_chart('stats', filter_values, session_id, general_stats)
+
+@chart_callback([Output('room-type-distribution', 'figure'), Output('room-type-description', 'children')], filter_inputs, State('session-id', 'data'))
+def update_room_type(*filter_values):
+    *filter_values, session_id = filter_values
+    figure, description = cached_chart('room_type', filter_values, session_id, room_type_chart)
+    return figure_patch(figure), description
+
+@chart_callback([Output('term_rentals', 'figure'), Output('term-rentals-description', 'children')], filter_inputs, State('session-id', 'data'))
+def update_term_rentals(*filter_values):
+    *filter_values, session_id = filter_values
+    term_type = filter_values[4]
+    figure, description = cached_chart('term_rentals', filter_values, session_id, term_rentals_chart, term_type)
+    return figure_patch(figure), description
+
+@chart_callback([Output('last_12m_availability', 'figure'), Output('12m-availability-description', 'children')],
+              filter_inputs + [Input('select-average-or-total', 'value')], State('session-id', 'data'))
+def update_availability(*filter_values):
+    *filter_values, view_avg_total, session_id = filter_values
+    figure, description = cached_chart('availability', filter_values, session_id, availability_chart, view_avg_total)
+    return figure_patch(figure), description
+
+@chart_callback([Output('price_distribution', 'figure'), Output('price-distribution-description', 'children')], filter_inputs, State('session-id', 'data'))
+def update_price_distribution(*filter_values):
+    *filter_values, session_id = filter_values
+    figure, description = cached_chart('price_distribution', filter_values, session_id, price_distribution_chart)
+    return figure_patch(figure), description
+
+@chart_callback([Output('top_np_price', 'figure'), Output('top-nb-price-description', 'children')], filter_inputs, State('session-id', 'data'))
+def update_area_price(*filter_values):
+    *filter_values, session_id = filter_values
+    selected_neighbourhood = filter_values[0]
+    figure, description = cached_chart('area_price', filter_values, session_id, area_price_chart, selected_neighbourhood)
+    return figure_patch(figure), description
+
+if client_filtering:
+    app.clientside_callback(ClientsideFunction('client_charts', 'stats'), Output('stats-output', 'children'), filter_inputs)
+    for function, graph, description, inputs in [
+            ('room_type', 'room-type-distribution', 'room-type-description', filter_inputs),
+            ('term_rentals', 'term_rentals', 'term-rentals-description', filter_inputs),
+            ('availability', 'last_12m_availability', '12m-availability-description',
+             filter_inputs + [Input('select-average-or-total', 'value')]),
+            ('price_distribution', 'price_distribution', 'price-distribution-description', filter_inputs),
+            ('area_price', 'top_np_price', 'top-nb-price-description', filter_inputs)]:
+        app.clientside_callback(ClientsideFunction('client_charts', function),
+                                [Output(graph, 'figure'), Output(description, 'children')], inputs, State(graph, 'figure'))
+
+@app.callback(Output('sankey-graph', 'figure'), filter_inputs, State('session-id', 'data'))
+def update_sankey(*filter_values):
+    *filter_values, session_id = filter_values
+    return figure_patch(cached_chart('sankey', filter_values, session_id, sankey_chart))
 
-    if term_type=='Short Term':
-        filtered_df=filtered_df[filtered_df['term_rentals']=="Short Term"]
-    elif term_type=='Long Term':
-        filtered_df=filtered_df[filtered_df['term_rentals']=="Long Term"]
-    else:
-        term_type=''
-    
-    if reviewed_listings=='Yes':
-        filtered_df=filtered_df[filtered_df['number_of_reviews']>1]
-    else:
-        None
-
-    # Create Folium map
-    if filtered_df['neighbourhood_group'].nunique()>1:
-        zoom=10
-    else:
-        if filtered_df['neighbourhood'].nunique()>1:
-            zoom=11
-        else:
-            zoom=14
-
-
-    # Create Sankey chart preprocess data
-    sankey_df=filtered_df[['id', 'neighbourhood_group', 'room_type', 'minimum_nights', 'price', 'host_is_superhost']]
-    sankey_df['minimum_nights']=sankey_df['minimum_nights'].apply(lambda x: 'Long Term' if x>30 else 'Short Term' if x is not None else None)
-    sankey_df['price']=pd.cut(sankey_df['price'], bins=[-np.inf, 100, 300, 500, np.inf], labels=['<100', '100-300', '300-500', '>500']).astype(str)
-    sankey_df['price']=sankey_df['price'].replace('nan', 'price_NA')
-    sankey_df['host_is_superhost']=sankey_df['host_is_superhost'].fillna('superhost_NA')
-    sankey_df['host_is_superhost']=sankey_df['host_is_superhost'].replace(['t', 'f'], ['superhost', 'not superhost'])
-
-    sankey_df['all']='All Listing'
-    sankey_df_grp=sankey_df.groupby(['all', 'neighbourhood_group', 'room_type', 'minimum_nights', 'price','host_is_superhost'])['id'].nunique().reset_index()
-
-    layer_1_df=sankey_df_grp.groupby(['all', 'neighbourhood_group'])['id'].sum().reset_index()
-    layer_1_df.columns=['source', 'target', 'value']
-
-    layer_2_df=sankey_df_grp.groupby(['neighbourhood_group', 'room_type'])['id'].sum().reset_index()
-    layer_2_df.columns=['source', 'target', 'value']
-
-    layer_3_df=sankey_df_grp.groupby(['room_type', 'minimum_nights'])['id'].sum().reset_index()
-    layer_3_df.columns=['source', 'target', 'value']
-
-    layer_4_df=sankey_df_grp.groupby(['minimum_nights', 'price'])['id'].sum().reset_index()
-    layer_4_df.columns=['source', 'target', 'value']
-
-    layer_5_df=sankey_df_grp.groupby(['price', 'host_is_superhost'])['id'].sum().reset_index()
-    layer_5_df.columns=['source', 'target', 'value']
-
-    sankey_df_final=pd.concat([layer_2_df, layer_3_df, layer_4_df, layer_5_df])
-
-    df_node = sankey_df_final.copy()
-    # Get a list of all unique nodes
-    unique_nodes = pd.concat([df_node['source'], df_node['target']]).unique()
-
-    # Create a mapping from node names to indices
-    node_mapping = {node: i for i, node in enumerate(unique_nodes)}
-
-    # Use the mapping to transform the source and target columns to indices
-    df_node['source'] = df_node['source'].map(node_mapping)
-    df_node['target'] = df_node['target'].map(node_mapping)
+@app.callback(
+    Output("modal-trends", "is_open"),
+    [Input("open-trends", "n_clicks"), Input("close-trends", "n_clicks")],
+    [State("modal-trends", "is_open")],
+)
+def toggle_trends_modal(n1, n2, is_open):
+    if n1 or n2:
+        return not is_open
+    return is_open
 
+# trend charts for the current filters, only built while the modal is open
+@app.callback([Output('trend-price', 'figure'), Output('trend-room-type', 'figure'),
+               Output('trend-availability', 'figure'), Output('trend-description', 'children')],
+              [Input('modal-trends', 'is_open')] + filter_inputs)
+def update_trends(is_open, *filter_values):
+    if not is_open:
+        raise PreventUpdate
+    filters = parse_filters(*filter_values)
+    with metrics.span('trends'):
+        trend_store.load()
+        return figure_cache.get_or_compute(('trends', trend_store.version, filter_key(filters)),
+                                           lambda: trend_charts(trend_store.selections(filters)))
+
+# the modal shows the Sankey figure already built for the page, copied when the modal opens
+@app.callback(Output('sankey-chart-modal', 'figure'), [Input('modal-sankey', 'is_open')], [State('sankey-graph', 'figure')])
+def update_sankey_modal(is_open, sankey_fig):
+    if not is_open:
+        raise PreventUpdate
+    return sankey_fig
 
-    # Create the Sankey diagram
-    sankey_fig = go.Figure(data=[go.Sankey(
-        node=dict(
-            pad=15,
-            thickness=20,
-            line=dict(color="black", width=0.5),
-            label=unique_nodes
-        ),
-        link=dict(
-            source=df_node['source'],  # Source indices
-            target=df_node['target'],  # Target indices
-            value=df_node['value'],    # Flow values
-        ))])
-
-    # Update layout and show the plot
-    sankey_fig.update_layout(title_text="Flow of listings to become Superhost-listings", 
-                            font_size=12,
-                            margin=dict(l=20, r=20, t=30, b=20), 
-                            title=dict(x=0.01, y=0.97),
-                            paper_bgcolor='aliceblue')
-
-    
-    m = folium.Map(location=[filtered_df['latitude'].median(), filtered_df['longitude'].median()], zoom_start=zoom, height='75%')
-    FastMarkerCluster(data=filtered_df[['latitude', 'longitude']].values, 
-                      #popups=[folium.Popup(row['name']) for _,row in filtered_df.iterrows()]
-                      ).add_to(m)
-    folium.LayerControl().add_to(m)
-    map_html = m._repr_html_()
-    
-    # Room type distribution figure
-    room_type_fig = px.pie(filtered_df, names='room_type', title='Room Type Distribution')
-    room_type_fig.update_traces(textinfo='value+percent')
-    room_type_fig.update_layout(font_size=12, margin=dict(l=20, r=20, t=40, b=20), title=dict(x=0.01, y=0.97), paper_bgcolor='aliceblue')    
-
-    pop_roomtype = filtered_df.groupby('room_type')['id'].nunique().sort_values(ascending=False)
-    pop_roomtype = ' and '.join(list(pop_roomtype.index)[:2])
-    room_type_desc=html.Small([html.P(f"[INFO] Airbnb hosts have the option to offer various types of accommodations including entire homes or apartments, \
-                                    private rooms, shared rooms, and, more recently, hotel rooms.The type of room and the manner in which it is managed \
-                                    can make some Airbnb listings operate similarly to hotels, which can be disruptive for neighbors, reduce available housing, \
-                                    and in some cases, contravene local laws."), 
-                               html.P(f"[INSIGHTS] Most of the listings available are generally {pop_roomtype} in this area.")]) 
-
-    # term_rentals figure
-    if not term_type: 
-        term_rentals_df = filtered_df.groupby('term_rentals')['id'].nunique().reset_index()
-        term_rentals_df.columns=['Rental Term', 'count of listings']
-        plot_title = 'Rental Term Distribution'
-        text1="[ACTION]: Please Toggle 'Term of Rental' filter to see additional breakdown on Minimum number of nights"
-        text2=""
-        text3=""
-    elif term_type=="Short Term":
-        term_rentals_df = filtered_df.groupby('minimum_nights_bin')['id'].nunique().reset_index()
-        term_rentals_df = term_rentals_df[term_rentals_df['minimum_nights_bin'].isin(['<=5', '5-10', '10-15', '15-20', '20-25', '25-30'])]
-        term_rentals_df.columns=['Minimum Nights to book', 'count of listings']
-        plot_title='{} Rentals Distribution'.format(term_type).lstrip()
-        text1="[ACTION] Please Remove 'Term of Rental' filter to go back to seeing Overall Rental Term Distribution"
-        (pl1, pl2) = (list(term_rentals_df[term_rentals_df['Minimum Nights to book']=='<=5']['count of listings'])[0],
-                      term_rentals_df['Minimum Nights to book'][term_rentals_df['count of listings'].argmax()])
-        text2 = f"[INSIGHTS] {pl1} listings have <5 Minimum nights policy. Majorly Listings have {pl2} nights as Minimum nights policy"
-        text3 = f"[INFO] Airbnb's short-term rental policies often require hosts to register and obtain licenses, \
-                adhere to occupancy and duration limits to prevent residential properties from becoming full-time vacation rentals, \
-                and comply with local tax regulations. Safety standards, such as fire and health safety compliance, are also mandated in many jurisdictions. \
-                These regulations aim to balance the interests of short-term rentals with community needs and safety."
-    elif term_type=="Long Term":
-        term_rentals_df = filtered_df.groupby('minimum_nights_bin')['id'].nunique().reset_index()
-        term_rentals_df = term_rentals_df[~term_rentals_df['minimum_nights_bin'].isin(['<=5', '5-10', '10-15', '15-20', '20-25', '25-30'])]
-        term_rentals_df.columns=['Minimum Nights to book', 'count of listings']
-        plot_title='{} Term Rentals Distribution'.format(term_type).lstrip()
-        text1="[ACTION] Please Remove 'Term of Rental' filter to go back to seeing Overall Rental Term Distribution"
-        (pl1,pl2) = (list(term_rentals_df['Minimum Nights to book'])[term_rentals_df['count of listings'].argmax()],
-                    term_rentals_df[~term_rentals_df['Minimum Nights to book'].isin(['30-60', '60-90', '90-120', '120-150', '150-180'])]['count of listings'].sum())
-        text2 = f"[INSIGHTS] Majorly Listings have {pl1} nights as Minimum nights policy. {pl2} listings have more than 6m as Minimum nights Policy"
-        text3 = f"[INFO] Airbnb's long-term rental policies include a modified payment structure where guests pay monthly instead of upfront, \
-                  making financial management easier and more akin to traditional leasing. \
-                  Cancellation policies for these rentals require a 30-day notice, providing security for both parties \
-                  but also imposing a potential cost on guests who cancel mid-stay. \
-                  Additionally, compliance with local housing regulations, potential requirements for lease agreements, \
-                  and adherence to safety and maintenance standards ensure that long-term stays align with both Airbnb's guidelines and local laws."
-    term_rentals_df['Percentage']=((term_rentals_df['count of listings']/term_rentals_df['count of listings'].sum())*100).round(1)
-    term_rentals= px.bar(term_rentals_df, x=term_rentals_df.columns[0], y=term_rentals_df.columns[1], title=plot_title, text=term_rentals_df['Percentage'])
-    term_rentals.update_traces(texttemplate='%{text}%', textposition='outside')
-    term_rentals.update_layout(font_size=12, margin=dict(l=20, r=20, t=40, b=20), title=dict(x=0.01, y=0.97), paper_bgcolor='aliceblue')
-    
-    term_rentals_desc=html.Small([html.P(text1),
-                                  html.P(text2),
-                                  html.P(text3)])
-
-    # booking last 12m figure
-    last_12m_availability_df=filtered_df.groupby('last_1yr_availability')['id'].nunique().reset_index()
-    last_12m_availability_df.columns=['No. of Days booked in last 365 Days', 'count of listings']
-    last_12m_availability_df['Percentage']=((last_12m_availability_df['count of listings']/last_12m_availability_df['count of listings'].sum())*100).round(1)
-    #last_12m_availability = px.bar(last_12m_availability_df, x=last_12m_availability_df.columns[0], y=last_12m_availability_df.columns[1], title='Last 365 Days availability', text=last_12m_availability_df['Percentage'])
-    #last_12m_availability.update_traces(texttemplate='%{text}%', textposition='outside')
-    #last_12m_availability.update_layout(font_size=12, margin=dict(l=20, r=20, t=40, b=20), title=dict(x=0.01, y=0.97), paper_bgcolor='aliceblue')
-
-    # Average Earnings based on last 12 Months availability
-    average_earnings_df=(filtered_df.groupby('last_1yr_availability')['price'].sum()/filtered_df.groupby('last_1yr_availability')['id'].nunique()).reset_index()
-    average_earnings_df.columns=['No. of Days booked in last 365 Days', 'Average Earnings in Dollars']
-
-    # Total Earnings 
-    total_earnings_df=filtered_df.copy()
-    total_earnings_df['price']=total_earnings_df['price']*(365-total_earnings_df['availability_365'])
-    total_earnings_df=total_earnings_df.groupby('last_1yr_availability')['price'].sum().reset_index()
-    total_earnings_df.columns=['No. of Days booked in last 365 Days', 'Total Earnings in Dollars']
-
-
-    # Dual axis figure for last_12m_availability and average_earnings
-    last_12m_availability = make_subplots(specs=[[{"secondary_y": True}]])
-
-    # Add bar chart to the figure on the primary y-axis
-    last_12m_availability.add_trace(
-        go.Bar(
-            x=last_12m_availability_df[last_12m_availability_df.columns[0]], 
-            y=last_12m_availability_df[last_12m_availability_df.columns[1]], 
-            text=last_12m_availability_df['Percentage'],
-            texttemplate='%{text}%', 
-            textposition='outside',
-            hoverinfo='name+x+y',
-            name='Listings'
-        ),
-        secondary_y=False  # Indicates that this goes on the first y-axis
-    )
-
-    # Add line chart to the figure on the secondary y-axis
-    if view_avg_total=='Show Average Earnings':
-
-        last_12m_availability.add_trace(
-            go.Scatter(
-                x=average_earnings_df[average_earnings_df.columns[0]][1:], 
-                y=average_earnings_df[average_earnings_df.columns[1]][1:],
-                name='Earnings',
-                mode='lines+markers',
-                text = [f'Average: {format_number(i)}, Total: {format_number(j)}' for i,j in zip(average_earnings_df['Average Earnings in Dollars'][1:], total_earnings_df['Total Earnings in Dollars'][1:])],
-                hoverinfo='text+name'
-            ),
-            secondary_y=True  # Indicates that this goes on the second y-axis
-        )
-        # Set primary y-axis title
-        last_12m_availability.update_yaxes(title_text='count of listings', secondary_y=False)
-
-        # Set secondary y-axis title
-        last_12m_availability.update_yaxes(title_text='Earnings per night in Dollars', secondary_y=True)
-
-        plot_title='Last 365 Days availability and Average Earnings per night'
-    
-    elif view_avg_total=='Show Total Earnings':
-
-        last_12m_availability.add_trace(
-            go.Scatter(
-                x=total_earnings_df[total_earnings_df.columns[0]][1:], 
-                y=total_earnings_df[total_earnings_df.columns[1]][1:],
-                name='Earnings',
-                mode='lines+markers',
-                text = [f'Average: {format_number(i)}, Total: {format_number(j)}' for i,j in zip(average_earnings_df['Average Earnings in Dollars'][1:], total_earnings_df['Total Earnings in Dollars'][1:])],
-                hoverinfo='text+name'
-            ),
-            secondary_y=True  # Indicates that this goes on the second y-axis
-        )
-        # Set primary y-axis title
-        last_12m_availability.update_yaxes(title_text='count of listings', secondary_y=False)
-
-        # Set secondary y-axis title
-        last_12m_availability.update_yaxes(title_text='Total Earnings in Dollars', secondary_y=True)
-
-        plot_title='Last 365 Days availability and Total Earnings'
-
-
-    # Set x-axis title
-    last_12m_availability.update_xaxes(title_text='No. of Days booked in last 365 Days')
-
-    
-    # Set chart title
-    last_12m_availability.update_layout(title_text=plot_title, 
-                                        margin=dict(l=20, r=20, t=40, b=20), 
-                                        title=dict(x=0.01, y=0.97), 
-                                        paper_bgcolor='aliceblue',
-                                        legend=dict(x=0.8,y=-0.4)
-                                        )
-
-    last_12m_availability_desc=html.Small([html.P("[ACTION] Toggle filter below the chart to switch between viewing 'Average Earnings' and 'Total Earnings'. Total Earnings is actually overall earning of the cohort. Calculated by (Price_per_night)*(number_of_night_booked)"),
-                                            html.P("[ACTION] Check Average earnings per night for different cohorts by toggling filters."),
-                                            html.P("[INFO] Booking data can highlight demand trends, \
-                                                  showing when and where properties are most sought after. \
-                                                  A high number of days booked suggests strong market demand or \
-                                                  less strict local rental regulations, while properties with fewer \
-                                                  bookings might indicate overpricing or a saturated market. \
-                                                  A prevalence of heavily booked listings may point to professional \
-                                                  hosting operations rather than individual hosts.\
-                                                  By correlating availability with earnings, \
-                                                  hosts can optimize pricing to maximize revenue during peak demand periods."),
-                                            ]) 
-
-    
-    #price distribution figure
-    price_distribution_df=filtered_df.groupby('price_bin')['id'].nunique().reset_index()
-    price_distribution_df.columns=['Price in Dollars', 'count of listings']
-    price_distribution_df['Percentage']=((price_distribution_df['count of listings']/price_distribution_df['count of listings'].sum())*100).round(1)
-    price_distribution = px.bar(price_distribution_df, x=price_distribution_df.columns[0], y=price_distribution_df.columns[1], title='Price Distribution', text=price_distribution_df['Percentage'])
-    price_distribution.update_traces(texttemplate='%{text}%', textposition='outside')
-    price_distribution.update_layout(font_size=12, margin=dict(l=20, r=20, t=40, b=20), title=dict(x=0.01, y=0.97), paper_bgcolor='aliceblue')
-
-    price_distribution_desc=html.Small([html.P("[INFO] Price distribution data can reveal pricing \
-                                               trends and market segmentation, helping to identify budget, mid-range, \
-                                               and luxury accommodations. Competitive analysis through price distribution helps \
-                                               hosts adjust their rates competitively. \
-                                               Over time, this can uncover long-term trends in regional \
-                                               attractiveness and market dynamics."
-                                               )]) 
-
-    # Average Price based on Neighbourhood
-    if filtered_df['neighbourhood_group'].nunique()>1:
-        top_nb_price_df=filtered_df.groupby('neighbourhood_group')['price'].median().reset_index()
-        top_nb_price_df.columns=['Neighood Group','Price in Dollars']
-        text1="[ACTION] Select a neighbourhood group from 'Area' Filter to see median prices for areas in the Neighbourhood."
-    else:
-        top_nb_price_df=filtered_df.groupby('neighbourhood')['price'].median().reset_index()
-        top_nb_price_df.columns=['Neighood Area','Price in Dollars']
-        if len(nb_ls)>1:
-            pl=nb_ls[0]
-            text1=f"""[ACTION] Select '{pl}' from 'Area' filter to switch back to comparing prices of all areas from {pl} neighbourhood"""
-        else:
-            text1=""
-
-    top_nb_price_df=top_nb_price_df.sort_values('Price in Dollars', ascending=True)
-    
-    top_nb_price = px.bar(top_nb_price_df, x=top_nb_price_df.columns[0], y=top_nb_price_df.columns[1], title='Area-wise Median Price', width=None)
-    top_nb_price.update_layout(font_size=12, margin=dict(l=20, r=20, t=40, b=20), title=dict(x=0.01, y=0.97), paper_bgcolor='aliceblue')
-
-    
-    top_nb_price_desc=html.Small([html.P(text1),
-                                  html.P("[INFO] Area-wise median price analysis for listings can highlight regional pricing benchmarks, \
-                                         helping travelers and hosts make informed decisions about lodging costs. \
-                                         These prices can also reflect the economic health and desirability of different areas, \
-                                         influencing real estate valuations and investment opportunities. \
-                                         Comparisons across regions can reveal market saturation or untapped opportunities, \
-                                         guiding new hosts on where to establish their listings competitively. \
-                                         ")]) 
-    
-    # Stats output
-    stats =  dbc.Row([html.H4("General Statistics", className="text-center"),
-             dbc.Col([html.H6(f"Total Listings", className="text-center"), html.P(f"{len(filtered_df)}", className="text-center")]),
-             dbc.Col([html.H6(f"Average Price", className="text-center"), html.P(f"${filtered_df['price'].mean():.2f}", className="text-center")]),
-             dbc.Col([html.H6(f"Median Price", className="text-center"), html.P(f" ${filtered_df['price'].median():.2f}", className="text-center")])
-            ])
-    
-    
-    
-
-    return map_html, \
-            room_type_fig, \
-            stats, \
-            term_rentals, \
-            last_12m_availability, \
-            price_distribution, \
-            top_nb_price, \
-            room_type_desc, \
-            term_rentals_desc, \
-            last_12m_availability_desc, \
-            price_distribution_desc, \
-            top_nb_price_desc, \
-            sankey_fig, \
-            sankey_fig
 # add folium markers as in openairbnb data
 # add all the dynamic place holder text
 # add dashboard descripts
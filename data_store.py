@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import resource
+
+import numpy as np
+import pandas as pd
+
+from figure_cache import file_fingerprint
+from schema import apply_schema, memory_report
+from features import derive_features
+
+# columns of the Inside Airbnb listings file used by the dashboard
+LISTINGS_COLUMNS = ['id', 'neighbourhood_group', 'neighbourhood', 'latitude', 'longitude', 'room_type', 'price',
+                    'minimum_nights', 'number_of_reviews', 'availability_365', 'host_is_superhost']
+
+
+# rows per chunk of the streaming ingest and the dataset build, a multiple of 8 (see BitmapBuilder)
+CHUNK_ROWS = 200_000
+# text columns read as strings in every chunk, a chunk without values would otherwise be read as floats
+TEXT_COLUMNS = {'neighbourhood_group': str, 'neighbourhood': str, 'room_type': str, 'host_is_superhost': str}
+
+
+def read_listings_csv(path):
+    return pd.read_csv(path, usecols=LISTINGS_COLUMNS)
+
+
+# smallest signed integer type that holds the category codes (and -1 for missing)
+def _code_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class StoreWriter:
+    """Writes a store from chunks of prepared listings, holding one chunk at a time.
+
+    Every chunk's columns are appended to raw part files, with categorical codes
+    re-coded against the categories of all chunks seen so far. `close` copies
+    the parts into the final .npy columns, sorting the categories of unordered
+    columns like a whole-file astype('category'), and writes meta.json last, so
+    an interrupted ingest never leaves a store that looks complete.
+    """
+
+    def __init__(self, store_path, source=None):
+        os.makedirs(store_path, exist_ok=True)
+        if os.path.exists(os.path.join(store_path, 'meta.json')):
+            os.remove(os.path.join(store_path, 'meta.json'))
+        self.store_path = store_path
+        self.source = source
+        self.n_rows = 0
+        # name -> raw segments [(dtype, rows)], categories {label: code in the parts} or None, ordered
+        self.columns = {}
+
+    def _part_path(self, name):
+        return os.path.join(self.store_path, f'{name}.part')
+
+    def append(self, chunk_df):
+        for name in chunk_df.columns:
+            series = chunk_df[name]
+            column = self.columns.setdefault(name, {'segments': [], 'categories': None, 'ordered': False})
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                categories = column['categories'] = column['categories'] or {}
+                column['ordered'] = bool(series.cat.ordered)
+                for label in series.cat.categories:
+                    categories.setdefault(label, len(categories))
+                # chunk code -> part code, the last entry keeps missing values at -1
+                recode = np.array([categories[label] for label in series.cat.categories] + [-1], dtype=np.int32)
+                values = recode[series.cat.codes.to_numpy()]
+            else:
+                values = series.to_numpy()
+            with open(self._part_path(name), 'ab') as f:
+                values.tofile(f)
+            column['segments'].append((values.dtype, len(values)))
+        self.n_rows += len(chunk_df)
+
+    def close(self):
+        meta = {'n_rows': self.n_rows, 'source': file_fingerprint(self.source) if self.source else None, 'columns': {}}
+        for name, column in self.columns.items():
+            if column['categories'] is not None:
+                labels = list(column['categories'])
+                categories = labels if column['ordered'] else sorted(labels)
+                recode = np.full(len(labels) + 1, -1, dtype=np.int64)
+                recode[[column['categories'][label] for label in categories]] = np.arange(len(categories))
+                dtype = _code_dtype(len(categories))
+                meta['columns'][name] = {'kind': 'category', 'categories': categories, 'ordered': column['ordered']}
+            else:
+                # integer chunks with missing values were cast to floats (see schema._cast), the column takes
+                # the type that holds every chunk, e.g. float64 for int64 ids with one missing value
+                dtype = np.result_type(*{dtype for dtype, _ in column['segments']})
+                recode = None
+                meta['columns'][name] = {'kind': 'numeric'}
+
+            target = np.lib.format.open_memmap(os.path.join(self.store_path, f'{name}.npy'), mode='w+',
+                                               dtype=dtype, shape=(self.n_rows,))
+            offset = 0
+            with open(self._part_path(name), 'rb') as f:
+                for segment_dtype, n_rows in column['segments']:
+                    values = np.fromfile(f, dtype=segment_dtype, count=n_rows)
+                    target[offset:offset + n_rows] = values if recode is None else recode[values]
+                    offset += n_rows
+            target.flush()
+            del target
+            os.remove(self._part_path(name))
+        with open(os.path.join(self.store_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, default=str)
+
+
+def read_store_meta(store_path):
+    try:
+        with open(os.path.join(store_path, 'meta.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# open the store memory-mapped; pages are read on first access and shared between processes
+def open_store(store_path):
+    meta = read_store_meta(store_path)
+    columns = {}
+    for name, column_meta in meta['columns'].items():
+        values = np.load(os.path.join(store_path, f'{name}.npy'), mmap_mode='r')
+        if column_meta['kind'] == 'category':
+            values = pd.Categorical.from_codes(values, column_meta['categories'], ordered=column_meta['ordered'])
+        columns[name] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+# listings from the csv with derived columns, converted to the compact schema
+def prepare_listings(csv_path):
+    listings_df = derive_features(read_listings_csv(csv_path))
+    compact_df = apply_schema(listings_df)
+    print(memory_report(listings_df, compact_df))
+    return compact_df
+
+
+# store path and meta of the ingested store when it was built from the current csv
+def current_store(csv_path, store_path=None):
+    store_path = store_path or os.path.splitext(csv_path)[0] + '_store'
+    meta = read_store_meta(store_path)
+    if meta is not None and (not os.path.exists(csv_path) or
+                             meta['source'] == list(file_fingerprint(csv_path))):
+        return store_path, meta
+    return None, None
+
+
+# the ingested store when it was built from the current csv, otherwise the csv itself
+def load_listings(csv_path, store_path=None):
+    store_path, _ = current_store(csv_path, store_path)
+    return open_store(store_path) if store_path else prepare_listings(csv_path)
+
+
+# prepared listings of a csv (path or open file) chunk by chunk; the bins are fixed, so any chunk derives alone
+def csv_chunks(csv, chunk_rows=CHUNK_ROWS):
+    for chunk in pd.read_csv(csv, usecols=LISTINGS_COLUMNS, dtype=TEXT_COLUMNS, chunksize=chunk_rows):
+        yield apply_schema(derive_features(chunk))
+
+
+# store columns chunk by chunk, only the rows of the current chunk are read from the memory map
+def store_chunks(store_path, meta, chunk_rows=CHUNK_ROWS):
+    columns = {name: np.load(os.path.join(store_path, f'{name}.npy'), mmap_mode='r') for name in meta['columns']}
+    for start in range(0, max(meta['n_rows'], 1), chunk_rows):
+        chunk = {}
+        for name, column_meta in meta['columns'].items():
+            values = np.array(columns[name][start:start + chunk_rows])
+            if column_meta['kind'] == 'category':
+                values = pd.Categorical.from_codes(values, column_meta['categories'], ordered=column_meta['ordered'])
+            chunk[name] = values
+        yield pd.DataFrame(chunk, copy=False)
+
+
+# prepared listings chunk by chunk, from the ingested store when it is current, otherwise from the csv
+def listing_chunks(csv_path, store_path=None, chunk_rows=CHUNK_ROWS):
+    store_path, meta = current_store(csv_path, store_path)
+    return store_chunks(store_path, meta, chunk_rows) if store_path else csv_chunks(csv_path, chunk_rows)
+
+
+def frame_chunks(listings_df, chunk_rows=CHUNK_ROWS):
+    for start in range(0, max(len(listings_df), 1), chunk_rows):
+        yield listings_df.iloc[start:start + chunk_rows]
+
+
+# streaming ingest: the csv is read, derived and converted chunk by chunk into the store,
+# memory is bounded by the chunk size rather than the file size
+def ingest_csv(csv_path, store_path, chunk_rows=CHUNK_ROWS):
+    writer = StoreWriter(store_path, source=csv_path)
+    total_mb = os.path.getsize(csv_path) / 1e6
+    start = time.perf_counter()
+    with open(csv_path, 'rb') as f:
+        for chunk in csv_chunks(f, chunk_rows):
+            writer.append(chunk)
+            seconds = time.perf_counter() - start
+            print(f'{writer.n_rows} rows, {f.tell() / 1e6:.0f}/{total_mb:.0f} MB in {seconds:.1f} s '
+                  f'({writer.n_rows / seconds:,.0f} rows/s, {f.tell() / 1e6 / seconds:.1f} MB/s)', flush=True)
+    writer.close()
+    print(f'peak memory {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB')
+    return writer.n_rows
+
+
+# one-time ingest: python data_store.py listings.csv [listings_store] [chunk_rows]
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else 'listings.csv'
+    store_path = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(csv_path)[0] + '_store'
+    chunk_rows = int(sys.argv[3]) if len(sys.argv) > 3 else CHUNK_ROWS
+    ingest_csv(csv_path, store_path, chunk_rows)
+    print(f'wrote {store_path}')
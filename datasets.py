@@ -0,0 +1,229 @@
+import json
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from data_store import listing_chunks, frame_chunks
+from figure_cache import file_fingerprint
+from filter_cube import FilterCube, CubeSelection, CubeBuilder
+from bitmap_index import BitmapIndex, BitmapBuilder
+from map_tiles import ClusterGrid
+from spatial_index import SpatialGrid
+from sankey_engine import SankeyEngine
+from incremental import IncrementalAggregator
+from chart_pool import SharedSnapshot
+from client_cube import compressed_snapshot
+from charts import map_view
+
+# filter dimensions pre-aggregated by the cube, charts are answered from the cube cells
+CUBE_DIMS = ['neighbourhood_group', 'neighbourhood', 'host_is_superhost', 'room_type', 'price_bin',
+             'term_rentals', 'reviewed', 'sankey_term', 'sankey_price', 'sankey_superhost']
+CUBE_HISTOGRAMS = {'minimum_nights_bin': ['count'],
+                   'last_1yr_availability': ['count', 'price', 'earnings']}
+
+# Sankey layers: area -> room type -> term -> price -> superhost
+SANKEY_DIMS = ['neighbourhood_group', 'room_type', 'sankey_term', 'sankey_price', 'sankey_superhost']
+
+# filter columns with a bitmap per value, used to pick the listing rows shown on the map
+MAP_FILTER_COLUMNS = ['neighbourhood_group', 'neighbourhood', 'room_type', 'price_bin',
+                      'term_rentals', 'host_is_superhost', 'reviewed']
+
+
+# bytes held by the numpy arrays reachable from obj
+def _array_bytes(obj, seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(_array_bytes(value, seen) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_array_bytes(value, seen) for value in obj)
+    if hasattr(obj, '__dict__'):
+        return _array_bytes(vars(obj), seen)
+    return 0
+
+
+class Dataset:
+    """One listings snapshot with every index and aggregate the dashboard serves from it.
+
+    The listings are never held as one DataFrame, see `build`.
+    """
+
+    def __init__(self, name, csv_path, store_path=None, relative_error=None):
+        self.name = name
+        self.csv_path = csv_path
+        self.store_path = store_path
+        self.relative_error = relative_error
+        # identifies this version of the snapshot in cache keys
+        self.key = (name, file_fingerprint(csv_path))
+        self.snapshot = None
+        self.client_snapshot = None
+        self.memory = 0
+
+    # build from the snapshot file, or from an already prepared listings DataFrame; the listings are read
+    # chunk by chunk, each reduced to its cube cells and bitmaps, so only the per-listing arrays the
+    # map keeps (coordinates and prices) grow with the file
+    def build(self, share=False, listings_df=None):
+        chunks = listing_chunks(self.csv_path, self.store_path) if listings_df is None else frame_chunks(listings_df)
+        cube = CubeBuilder(CUBE_DIMS, CUBE_HISTOGRAMS)
+        bitmaps = BitmapBuilder(MAP_FILTER_COLUMNS)
+        lat, lon, prices = [], [], []
+        groups, areas, room_types = set(), set(), {}
+        for chunk in chunks:
+            cube.add(chunk)
+            bitmaps.add(chunk)
+            lat.append(chunk['latitude'].to_numpy())
+            lon.append(chunk['longitude'].to_numpy())
+            prices.append(chunk['price'].to_numpy())
+            chunk_groups = chunk['neighbourhood_group'].astype(object)
+            groups.update(chunk_groups.unique())
+            areas.update((chunk_groups + ' | ' + chunk['neighbourhood'].astype(object)).unique())
+            room_types.update(dict.fromkeys(chunk['room_type'].astype(object).unique()))
+
+        self.cube = FilterCube.from_builder(cube, relative_error=self.relative_error)
+        self.sankey = SankeyEngine(self.cube, SANKEY_DIMS)
+        # last selection of every browser session; a filter change only adds/subtracts the cube cells that changed
+        self.aggregator = IncrementalAggregator(self.cube, self.sankey)
+
+        self.bitmaps = BitmapIndex.from_builder(bitmaps)
+        self.coords = np.column_stack([np.concatenate(lat), np.concatenate(lon)])
+        # one float copy of the coordinates shared by both grids
+        lat, lon = self.coords[:, 0].astype(float), self.coords[:, 1].astype(float)
+        # map clusters for any zoom level are derived from one grid binning of the coordinates
+        self.grid = ClusterGrid(lat, lon)
+        # viewport queries only touch the listings inside the bounding box
+        self.spatial = SpatialGrid(lat, lon)
+        self.prices = np.concatenate(prices)
+
+        self.neighbourhood_options = sorted(groups) + sorted(areas)
+        # in order of appearance
+        self.room_type_options = list(room_types)
+
+        # cube and Sankey engine in shared memory for the chart workers, released with the dataset
+        if share:
+            self.snapshot = SharedSnapshot((self.cube, self.sankey))
+            weakref.finalize(self, self.snapshot.close)
+        self.memory = _array_bytes([self.cube, self.sankey, self.bitmaps, self.coords, self.grid,
+                                    self.spatial, self.prices])
+        return self
+
+    # where the map opens for a {column: allowed values} filter, see BitmapIndex.select for `trace`
+    def map_view(self, filters, trace=None):
+        map_coords = self.coords[self.bitmaps.rows(self.bitmaps.select(filters, trace))]
+        return map_view(CubeSelection(self.cube, self.cube.cell_mask(filters)), map_coords)
+
+    # GeoJSON clusters of the filtered listings in bbox = (west, south, east, north)
+    def map_clusters(self, filters, zoom, bbox):
+        bitmap = self.bitmaps.select(filters)
+        rows = self.spatial.rows_in_bbox(bbox)
+        return self.grid.clusters(rows[self.bitmaps.contains(bitmap, rows)], zoom, bbox)
+
+    # count, median price/location and a sample of the filtered listings in bbox
+    def map_stats(self, filters, bbox):
+        bitmap = self.bitmaps.select(filters)
+        return self.spatial.query(bbox, lambda rows: self.bitmaps.contains(bitmap, rows), values={'price': self.prices})
+
+    # (gzipped json, ETag) of the cube for client filtering mode, encoded on first request
+    def client_cube(self):
+        if self.client_snapshot is None:
+            self.client_snapshot = compressed_snapshot(self.cube)
+        return self.client_snapshot
+
+
+class DatasetCatalog:
+    """Registered listings snapshots (cities, dates), one of which is active.
+
+    Activating a snapshot builds it and then swaps `active` with a single
+    assignment, so requests that already picked up the previous dataset finish
+    on it. Built datasets that are not active are kept for quick swaps back and
+    dropped, least recently active first, once all built datasets together
+    exceed `memory_budget` bytes.
+    """
+
+    def __init__(self, memory_budget=None, relative_error=None, share=False):
+        self.memory_budget = memory_budget
+        self.relative_error = relative_error
+        self.share = share
+        self.sources = OrderedDict()
+        self.built = OrderedDict()
+        self.building = set()
+        self.errors = {}
+        self.active = None
+        self.lock = threading.Lock()
+
+    def register(self, name, csv_path, store_path=None):
+        with self.lock:
+            self.sources[name] = (csv_path, store_path)
+
+    # register every {name, csv, store} entry of a json list
+    def register_file(self, path):
+        with open(path) as f:
+            entries = json.load(f)
+        for entry in entries:
+            self.register(entry['name'], entry['csv'], entry.get('store'))
+        return [entry['name'] for entry in entries]
+
+    def activate(self, name):
+        with self.lock:
+            csv_path, store_path = self.sources[name]
+            dataset = self.built.get(name)
+            self.building.add(name)
+        try:
+            # rebuilt when the snapshot file changed since it was built
+            if dataset is None or dataset.key != (name, file_fingerprint(csv_path)):
+                dataset = Dataset(name, csv_path, store_path, self.relative_error).build(self.share)
+        finally:
+            with self.lock:
+                self.building.discard(name)
+        with self.lock:
+            self.built[name] = dataset
+            self.built.move_to_end(name)
+            self.active = dataset
+            self.errors.pop(name, None)
+            self._evict()
+        return dataset
+
+    # build and swap in a background thread, the active dataset keeps serving meanwhile
+    def activate_in_background(self, name):
+        if name not in self.sources:
+            raise KeyError(name)
+        with self.lock:
+            if name in self.building:
+                return False
+            self.building.add(name)
+
+        def run():
+            try:
+                self.activate(name)
+            except Exception as e:
+                with self.lock:
+                    self.errors[name] = repr(e)
+
+        threading.Thread(target=run, daemon=True).start()
+        return True
+
+    def _evict(self):
+        if self.memory_budget is None:
+            return
+        total = sum(dataset.memory for dataset in self.built.values())
+        for name in list(self.built):
+            if total <= self.memory_budget:
+                break
+            if self.built[name] is not self.active:
+                total -= self.built.pop(name).memory
+
+    def status(self):
+        with self.lock:
+            return {'active': self.active.name if self.active else None,
+                    'memory_budget': self.memory_budget,
+                    'datasets': {name: {'csv': csv_path, 'store': store_path,
+                                        'built': name in self.built,
+                                        'memory': int(self.built[name].memory) if name in self.built else None,
+                                        'building': name in self.building,
+                                        'error': self.errors.get(name)}
+                                 for name, (csv_path, store_path) in self.sources.items()}}
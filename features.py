@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+# bin edges and labels of the derived columns, bins are right-inclusive like pd.cut
+MINIMUM_NIGHTS_BINS = [-np.inf, 5, 10, 15, 20, 25, 30, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330, np.inf]
+MINIMUM_NIGHTS_LABELS = ['<=5', '5-10', '10-15', '15-20', '20-25', '25-30',
+                         '30-60', '60-90', '90-120', '120-150', '150-180',
+                         '180-210', '210-240', '240-270', '270-300', '300-330', '>330']
+
+PRICE_BINS = [-np.inf, 100, 150, 200, 250, 300, 350, 400, 500, 600, 700, 800, 900, 1000, np.inf]
+PRICE_LABELS = ['<100', '100-150', '150-200', '200-250', '250-300', '300-350',
+                '350-400', '400-500', '500-600', '600-700', '700-800', '800-900', '900-1000', '>1000']
+
+BOOKED_NIGHTS_BINS = [-np.inf, 0, 31, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330, np.inf]
+BOOKED_NIGHTS_LABELS = ['0', '1-30', '30-60', '60-90', '90-120', '120-150', '150-180', '180-210',
+                        '210-240', '240-270', '270-300', '300-330', '>330']
+
+SANKEY_PRICE_BINS = [-np.inf, 100, 300, 500, np.inf]
+SANKEY_PRICE_LABELS = ['<100', '100-300', '300-500', '>500', 'price_NA']
+
+TERM_LABELS = ['Short Term', 'Long Term']
+SANKEY_SUPERHOST_LABELS = ['superhost', 'not superhost', 'superhost_NA']
+
+
+# bin codes of `values`, -1 where the value is missing
+def bin_codes(values, bins):
+    values = np.asarray(values, dtype=float)
+    codes = np.searchsorted(bins, values, side='left') - 1
+    codes[np.isnan(values)] = -1
+    return codes
+
+
+# categorical from codes; unordered ones get sorted categories so they group like strings
+def categorical(codes, labels, ordered=False):
+    result = pd.Categorical.from_codes(codes, labels, ordered=ordered)
+    return result if ordered else result.reorder_categories(sorted(labels))
+
+
+# every derived column used by the charts, filters and Sankey, computed in one vectorized pass
+def derive_features(listings_df):
+    minimum_nights = listings_df['minimum_nights'].to_numpy(dtype=float)
+    price = listings_df['price'].to_numpy(dtype=float)
+    booked_nights = 365 - listings_df['availability_365'].to_numpy(dtype=float)
+    superhost = listings_df['host_is_superhost'].astype(object).to_numpy()
+
+    listings_df['minimum_nights_bin'] = categorical(bin_codes(minimum_nights, MINIMUM_NIGHTS_BINS),
+                                                    MINIMUM_NIGHTS_LABELS, ordered=True)
+    listings_df['price_bin'] = categorical(bin_codes(price, PRICE_BINS), PRICE_LABELS, ordered=True)
+    listings_df['last_1yr_availability'] = categorical(bin_codes(booked_nights, BOOKED_NIGHTS_BINS),
+                                                       BOOKED_NIGHTS_LABELS, ordered=True)
+
+    # minimum nights up to 30 are short term, missing values have no term
+    listings_df['term_rentals'] = categorical(np.select([minimum_nights <= 30, minimum_nights > 30], [0, 1], -1),
+                                              TERM_LABELS)
+    listings_df['reviewed'] = listings_df['number_of_reviews'].to_numpy() > 1
+
+    # sankey dimensions, missing values get their own node
+    listings_df['sankey_term'] = categorical(np.where(minimum_nights > 30, 1, 0), TERM_LABELS)
+    sankey_price = bin_codes(price, SANKEY_PRICE_BINS)
+    listings_df['sankey_price'] = categorical(np.where(sankey_price < 0, 4, sankey_price), SANKEY_PRICE_LABELS)
+    listings_df['sankey_superhost'] = categorical(np.select([superhost == 't', superhost == 'f'], [0, 1], 2),
+                                                  SANKEY_SUPERHOST_LABELS)
+    return listings_df
@@ -0,0 +1,117 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, CancelledError
+
+
+# identifies a version of the data file, the cache is dropped when it changes
+def file_fingerprint(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+class FigureCache:
+    """Bounded LRU cache for chart outputs.
+
+    Entries are charged by their pickled size and evicted least recently used
+    first once `max_bytes` is exceeded. When `path` is given the cache can be
+    saved to and restored from disk. Keys include the version of the data they
+    were built from (the dashboard uses Dataset.key), so a new data file simply
+    misses and its stale entries age out.
+
+    Concurrent misses on the same key are computed once: later callers wait
+    for the result of the first (single-flight). If that computation was
+    cancelled, the waiting callers compute the entry themselves.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, path=None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        while True:
+            with self.lock:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return self.entries[key][0]
+                flight = self.in_flight.get(key)
+                if flight is None:
+                    flight = self.in_flight[key] = Future()
+                    self.misses += 1
+                    break
+                self.coalesced += 1
+            try:
+                return flight.result()
+            except CancelledError:
+                continue
+
+        try:
+            value = compute()
+        except BaseException as error:
+            with self.lock:
+                del self.in_flight[key]
+            flight.set_exception(error)
+            raise
+        self.put(key, value)
+        with self.lock:
+            del self.in_flight[key]
+        flight.set_result(value)
+        return value
+
+    def put(self, key, value, size=None):
+        if size is None:
+            size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return {'entries': len(self.entries), 'bytes': self.size, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'coalesced': self.coalesced}
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            snapshot = {'entries': list(self.entries.items())}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return
+        for key, (value, size) in snapshot['entries']:
+            self.put(key, value, size)
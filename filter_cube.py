@@ -0,0 +1,296 @@
+import numpy as np
+import pandas as pd
+
+from quantiles import CellQuantiles
+
+
+# integer-code a column; missing values get the extra code len(labels)
+# binned (ordered categorical) columns keep every bin as a label, like pd.cut output
+def encode_column(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        labels = list(series.cat.categories)
+        codes = series.cat.codes.to_numpy().astype(np.int64)
+        binned = bool(series.cat.ordered)
+    else:
+        codes, uniques = pd.factorize(series, sort=True)
+        labels = list(uniques)
+        codes = codes.astype(np.int64)
+        binned = False
+    codes[codes < 0] = len(labels)
+    return codes, labels, binned
+
+
+# per-listing quantities summed up by the cube
+def listing_measures(df):
+    price = df['price'].to_numpy(dtype=float)
+    booked_nights = 365 - df['availability_365'].to_numpy(dtype=float)
+    return {'count': np.ones(len(df), dtype=np.int64),
+            'price': np.nan_to_num(price),
+            'price_count': (~np.isnan(price)).astype(np.int64),
+            'earnings': np.nan_to_num(price * booked_nights),
+            'booked_nights': np.nan_to_num(booked_nights)}
+
+
+def _sum_by(keys, weights, length, dtype):
+    totals = np.bincount(keys, weights=weights, minlength=length)
+    if np.issubdtype(dtype, np.integer):
+        return np.rint(totals).astype(np.int64)
+    return totals
+
+
+# per-bin sums of listing measures over integer bin codes (0..n_bins-1, n_bins for missing), every measure
+# summed over one shared key array; with `cell` (row -> cube cell) the sums are kept per cell, one row each
+def bin_sums(codes, n_bins, measures, names=None, cell=None, n_cells=1):
+    width = n_bins + 1
+    keys = codes if cell is None else cell * width + codes
+    return {name: _sum_by(keys, measures[name], n_cells * width, measures[name].dtype).reshape(n_cells, width)
+            for name in (names or measures)}
+
+
+# per-bin table of summed measures (count, price, earnings, ...) and the average price per listing
+def bin_table(sums, labels, name=None):
+    table = pd.DataFrame({measure: np.ravel(values)[:len(labels)] for measure, values in sums.items()},
+                         index=pd.Index(labels, name=name))
+    if 'price' in table and 'count' in table:
+        table['average_price'] = table['price'] / table['count']
+    return table
+
+
+# count, price sum, booked-night revenue and average price per value of `dim` straight from a listings
+# frame, the same sums the cube serves the charts; e.g. aggregate_bins(df, 'last_1yr_availability')
+def aggregate_bins(df, dim):
+    codes, labels, _ = encode_column(df[dim])
+    return bin_table(bin_sums(codes, len(labels), listing_measures(df)), labels, dim)
+
+
+# labels of a column seen in several chunks (label -> first-seen code), in the order encode_column gives
+# the whole column: bins in their order, other values sorted like pd.factorize and astype('category')
+def merged_labels(seen, binned):
+    return list(seen) if binned else sorted(seen)
+
+
+class CubeBuilder:
+    """Listings added chunk by chunk (at least one) and reduced to the cells of each chunk, see FilterCube.from_builder.
+
+    A chunk's cells, measure sums, histograms and (cell, price, count) triples
+    are kept on codes of the labels in the order they were first seen, since
+    chunks of a csv may hold different categories. The cube merges the cells
+    with the same labels once every chunk is in, so memory follows the chunk
+    size and the number of cells rather than the number of listings.
+    """
+
+    def __init__(self, dims, histograms=None, value_col='price'):
+        self.dims = list(dims)
+        self.histograms = dict(histograms or {})
+        self.value_col = value_col
+        # label -> first-seen code, per cube and histogram dimension
+        self.seen = {dim: {} for dim in self.dims + list(self.histograms)}
+        self.binned = {}
+        self.parts = []
+
+    # first-seen codes of a chunk column, -1 where the value is missing
+    def _codes(self, dim, series):
+        codes, labels, binned = encode_column(series)
+        self.binned[dim] = binned
+        seen = self.seen[dim]
+        for label in labels:
+            seen.setdefault(label, len(seen))
+        return np.array([seen[label] for label in labels] + [-1], dtype=np.int64)[codes]
+
+    def add(self, df):
+        row_codes = [self._codes(dim, df[dim]) for dim in self.dims]
+        shape = tuple(len(self.seen[dim]) + 1 for dim in self.dims)
+        cell_keys, row_cell = np.unique(np.ravel_multi_index([codes + 1 for codes in row_codes], shape),
+                                        return_inverse=True)
+        n_cells = len(cell_keys)
+        measures = listing_measures(df)
+        part = {'codes': [codes - 1 for codes in np.unravel_index(cell_keys, shape)],
+                'cells': {name: _sum_by(row_cell, values, n_cells, values.dtype) for name, values in measures.items()},
+                'histograms': {}}
+        for dim, names in self.histograms.items():
+            # bin 0 holds the missing values, bin i + 1 the label first seen as i
+            codes = self._codes(dim, df[dim]) + 1
+            part['histograms'][dim] = bin_sums(codes, len(self.seen[dim]), measures, names, row_cell, n_cells)
+
+        prices = df[self.value_col].to_numpy(dtype=float)
+        known = ~np.isnan(prices)
+        values, value_codes = np.unique(prices[known], return_inverse=True)
+        n_values = max(len(values), 1)
+        keys, counts = np.unique(row_cell[known] * n_values + value_codes, return_counts=True)
+        part['quantiles'] = (keys // n_values, values[keys % n_values], counts)
+        self.parts.append(part)
+        return self
+
+
+class FilterCube:
+    """Aggregates of the listings for every observed combination of filter dimensions.
+
+    Each cell is one combination of dimension values. Queries pick cells with
+    `cell_mask` and sum their pre-aggregated measures, so the cost depends on the
+    number of cells, not the number of listings. Price quantiles are merged from
+    per-cell distributions, exact unless `relative_error` is given.
+    """
+
+    def __init__(self, df, dims, histograms=None, value_col='price', relative_error=None):
+        self._build(CubeBuilder(dims, histograms, value_col).add(df), relative_error)
+
+    # cube of the listings chunks added to a CubeBuilder
+    @classmethod
+    def from_builder(cls, builder, relative_error=None):
+        cube = cls.__new__(cls)
+        cube._build(builder, relative_error)
+        return cube
+
+    def _build(self, builder, relative_error):
+        labels = {dim: merged_labels(seen, builder.binned[dim]) for dim, seen in builder.seen.items()}
+        # first-seen code -> code of the merged labels, the last entry maps missing values (-1)
+        recode = {dim: np.array([labels[dim].index(label) for label in seen] + [len(labels[dim])], dtype=np.int64)
+                  for dim, seen in builder.seen.items()}
+        self.dims = builder.dims
+        self.labels = {dim: labels[dim] for dim in self.dims}
+        self.binned = {dim: builder.binned[dim] for dim in self.dims}
+
+        # chunk cells with the same labels are one cube cell
+        parts = builder.parts
+        shape = tuple(len(self.labels[dim]) + 1 for dim in self.dims)
+        chunk_keys = [np.ravel_multi_index([recode[dim][codes] for dim, codes in zip(self.dims, part['codes'])], shape)
+                      for part in parts]
+        cell_keys, chunk_cell = np.unique(np.concatenate(chunk_keys), return_inverse=True)
+        self.n_cells = len(cell_keys)
+        self.cell_codes = dict(zip(self.dims, np.unravel_index(cell_keys, shape)))
+        # cube cell of every chunk cell, per chunk
+        part_cells = np.split(chunk_cell, np.cumsum([len(keys) for keys in chunk_keys])[:-1])
+
+        self.cells = {name: _sum_by(chunk_cell, np.concatenate([part['cells'][name] for part in parts]),
+                                    self.n_cells, parts[0]['cells'][name].dtype)
+                      for name in parts[0]['cells']}
+
+        # per-cell histograms over the chart dimensions, e.g. availability bins
+        self.histograms = {}
+        self.hist_labels = {}
+        for dim, names in builder.histograms.items():
+            self.hist_labels[dim] = labels[dim]
+            # chunk bin 0 holds the missing values, see CubeBuilder.add
+            bins = np.concatenate([recode[dim][-1:], recode[dim][:-1]])
+            self.histograms[dim] = {}
+            for name in names:
+                matrix = np.zeros((self.n_cells, len(labels[dim]) + 1), dtype=parts[0]['histograms'][dim][name].dtype)
+                for part, cells in zip(parts, part_cells):
+                    values = part['histograms'][dim][name]
+                    np.add.at(matrix, (cells[:, None], bins[:values.shape[1]]), values)
+                self.histograms[dim][name] = matrix
+
+        # price distribution per cell for medians and other quantiles
+        self.price_quantiles = CellQuantiles(
+            np.concatenate([cells[part['quantiles'][0]] for part, cells in zip(parts, part_cells)]),
+            np.concatenate([part['quantiles'][1] for part in parts]), self.n_cells, relative_error,
+            np.concatenate([part['quantiles'][2] for part in parts]))
+
+    # boolean mask over cells for a {column: allowed values} filter; with a `trace` list,
+    # (column, listings in, listings out) of every filter step is appended to it
+    def cell_mask(self, filters, trace=None):
+        mask = np.ones(self.n_cells, dtype=bool)
+        for dim, values in filters.items():
+            labels = self.labels[dim]
+            codes = [labels.index(v) for v in values if v in labels]
+            rows_in = int(self.cells['count'][mask].sum()) if trace is not None else None
+            mask &= np.isin(self.cell_codes[dim], codes)
+            if trace is not None:
+                trace.append((dim, rows_in, int(self.cells['count'][mask].sum())))
+        return mask
+
+    # cells where none of the given dimensions is missing
+    def not_missing(self, dims):
+        mask = np.ones(self.n_cells, dtype=bool)
+        for dim in dims:
+            mask &= self.cell_codes[dim] != len(self.labels[dim])
+        return mask
+
+    # price quantiles overall (Series by q), or per observed value of `by` (one column per q)
+    def quantiles(self, mask, qs, by=None):
+        if by is None:
+            return pd.Series(self.price_quantiles.quantiles(mask, qs)[0], index=qs, name='price')
+        labels = self.labels[by]
+        values = self.price_quantiles.quantiles(mask, qs, self.cell_codes[by], len(labels) + 1)
+        observed = np.bincount(self.cell_codes[by][mask], minlength=len(labels) + 1)[:len(labels)] > 0
+        result = pd.DataFrame(values[:len(labels)], index=pd.Index(labels, name=by), columns=qs)
+        return result[observed]
+
+    # median price overall, or per observed value of `by`
+    def median(self, mask, by=None):
+        if by is None:
+            return self.quantiles(mask, [0.5])[0.5]
+        return self.quantiles(mask, [0.5], by)[0.5].rename('price')
+
+
+class CubeSelection:
+    """Additive aggregates of a set of cube cells, in the form the charts read them.
+
+    `updated` derives the selection for other cells from the cells that entered
+    or left it, so a small filter change only aggregates the changed cells.
+    Medians and other quantiles are not additive and are always computed from the cube.
+    """
+
+    def __init__(self, cube, cells, sankey=None, aggregates=None):
+        self.cube = cube
+        self.cells = cells
+        self.sankey = sankey
+        self.aggregates = aggregates if aggregates is not None else self._aggregate(cells)
+
+    def _aggregate(self, cells):
+        cube = self.cube
+        aggregates = {('total', name): values[cells].sum() for name, values in cube.cells.items()}
+        for dim in cube.dims:
+            aggregates[('counts', dim)] = _sum_by(cube.cell_codes[dim][cells], cube.cells['count'][cells],
+                                                  len(cube.labels[dim]) + 1, np.int64)
+        for dim, measures in cube.histograms.items():
+            for name, matrix in measures.items():
+                aggregates[('histogram', dim, name)] = matrix[cells].sum(axis=0)
+        if self.sankey is not None:
+            aggregates[('sankey',)] = self.sankey.link_values(cells)
+        return aggregates
+
+    def updated(self, cells):
+        added = self._aggregate(cells & ~self.cells)
+        removed = self._aggregate(self.cells & ~cells)
+        aggregates = {key: value + added[key] - removed[key] for key, value in self.aggregates.items()}
+        return CubeSelection(self.cube, cells, self.sankey, aggregates)
+
+    def total(self, measure='count'):
+        return self.aggregates[('total', measure)]
+
+    def mean(self):
+        n = self.total('price_count')
+        return self.total('price') / n if n else np.nan
+
+    # summed measures per value of `dim` (see bin_table): every histogram measure for a histogram dimension,
+    # the listing count for a cube dimension; like groupby, binned dimensions list every bin and others only observed values
+    def bin_stats(self, dim):
+        cube = self.cube
+        if dim in cube.histograms:
+            return bin_table({name: self.aggregates[('histogram', dim, name)] for name in cube.histograms[dim]},
+                             cube.hist_labels[dim], dim)
+        table = bin_table({'count': self.aggregates[('counts', dim)]}, cube.labels[dim], dim)
+        return table if cube.binned[dim] else table[table['count'] > 0]
+
+    # listings per value of `dim`
+    def counts(self, dim):
+        return self.bin_stats(dim)['count'].rename('id')
+
+    def counts_observed(self, dim):
+        return self.aggregates[('counts', dim)][:len(self.cube.labels[dim])] > 0
+
+    # totals per bin of a histogram dimension
+    def histogram(self, dim, measure='count'):
+        labels = self.cube.hist_labels[dim]
+        return pd.Series(self.aggregates[('histogram', dim, measure)][:len(labels)],
+                         index=pd.Index(labels, name=dim), name='id')
+
+    def median(self, by=None):
+        return self.cube.median(self.cells, by)
+
+    def quantiles(self, qs, by=None):
+        return self.cube.quantiles(self.cells, qs, by)
+
+    def sankey_flows(self):
+        return self.sankey.flows(self.aggregates[('sankey',)])
@@ -0,0 +1,47 @@
+import json
+
+
+# translate the dashboard controls into {column: allowed values}
+# an empty dict means "all listings"
+def parse_filters(selected_neighbourhood, check_super_host, listing_type, price_type, term_type, reviewed_listings):
+    filters = {}
+    if selected_neighbourhood:
+        nb_ls = selected_neighbourhood.split(' | ')
+        filters['neighbourhood_group'] = [nb_ls[0]]
+        if len(nb_ls) > 1:
+            filters['neighbourhood'] = [nb_ls[1]]
+
+    if check_super_host == 'Yes':
+        filters['host_is_superhost'] = ['t']
+
+    if listing_type:
+        filters['room_type'] = list(listing_type)
+
+    if price_type:
+        filters['price_bin'] = list(price_type)
+
+    if term_type in ('Short Term', 'Long Term'):
+        filters['term_rentals'] = [term_type]
+
+    if reviewed_listings == 'Yes':
+        filters['reviewed'] = [True]
+
+    return filters
+
+
+# hashable, order-insensitive key of a filter spec; equivalent control values give the same key
+def filter_key(filters):
+    return tuple(sorted((column, tuple(sorted(values, key=str))) for column, values in filters.items()))
+
+
+# filter spec sent back by the browser; unknown columns and malformed values (anything but a list of
+# scalars) are dropped
+def filters_from_json(text, columns):
+    try:
+        filters = json.loads(text or '{}')
+    except ValueError:
+        return {}
+    if not isinstance(filters, dict):
+        return {}
+    return {column: [value for value in values if isinstance(value, (str, int, float, bool))]
+            for column, values in filters.items() if column in columns and isinstance(values, list)}
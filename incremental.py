@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+from filter_cube import CubeSelection
+from filters import filter_key
+
+
+class IncrementalAggregator:
+    """Keeps the last CubeSelection of every session.
+
+    When a session changes its filters, the new selection is derived from the
+    previous one by adding the cells that entered and subtracting the cells that
+    left, as long as fewer cells changed than are selected. Otherwise, and for
+    requests without a session, the selection is aggregated from scratch.
+
+    A session's selection is stored as a future as soon as it is requested, so
+    the chart callbacks fired by one filter change compute it once and share it.
+    """
+
+    def __init__(self, cube, sankey=None, max_sessions=1000):
+        self.cube = cube
+        self.sankey = sankey
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.delta_updates = 0
+        self.full_updates = 0
+
+    # with a `trace` list, the call that computes the selection appends (column, listings in, listings out)
+    # of every filter step to it (see FilterCube.cell_mask); calls sharing a session's selection add nothing
+    def selection(self, session_id, filters, trace=None):
+        if session_id is None:
+            return CubeSelection(self.cube, self.cube.cell_mask(filters, trace), self.sankey)
+
+        key = filter_key(filters)
+        with self.lock:
+            previous = self.sessions.get(session_id)
+            if previous is not None and previous[0] == key:
+                self.sessions.move_to_end(session_id)
+                future = previous[1]
+            else:
+                future, pending = None, Future()
+                self.sessions[session_id] = (key, pending)
+                self.sessions.move_to_end(session_id)
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+        if future is not None:
+            return future.result()
+
+        try:
+            base = previous[1].result() if previous is not None else None
+        except Exception:
+            base = None
+        try:
+            cells = self.cube.cell_mask(filters, trace)
+            if base is not None and np.count_nonzero(cells ^ base.cells) < np.count_nonzero(cells):
+                selection = base.updated(cells)
+                delta = True
+            else:
+                selection = CubeSelection(self.cube, cells, self.sankey)
+                delta = False
+        except BaseException as error:
+            with self.lock:
+                if self.sessions.get(session_id, (None, None))[1] is pending:
+                    del self.sessions[session_id]
+            pending.set_exception(error)
+            raise
+        with self.lock:
+            if delta:
+                self.delta_updates += 1
+            else:
+                self.full_updates += 1
+        pending.set_result(selection)
+        return selection
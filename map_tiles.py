@@ -0,0 +1,62 @@
+import numpy as np
+
+TILE_SIZE = 256
+MAX_LATITUDE = 85.05112878
+
+
+# web mercator pixel coordinates at zoom level 0
+def mercator_pixels(lat, lon):
+    lat = np.radians(np.clip(np.asarray(lat, dtype=float), -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(lon, dtype=float) + 180) / 360 * TILE_SIZE
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2 * TILE_SIZE
+    return x, y
+
+
+class ClusterGrid:
+    """Listings binned once into square pixel cells of the deepest zoom level.
+
+    A cell at a coarser zoom is the deep cell index shifted right by the zoom
+    difference, so clusters for any zoom and bounding box come from integer
+    shifts and a bincount over the selected rows. From `max_zoom` on the
+    individual listings are returned.
+    """
+
+    def __init__(self, lat, lon, max_zoom=17, cell_px=64):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.max_zoom = max_zoom
+        self.cell_px = cell_px
+        self.valid = ~(np.isnan(self.lat) | np.isnan(self.lon))
+        self.ix, self.iy = self._cells(np.where(self.valid, self.lat, 0), np.where(self.valid, self.lon, 0))
+
+    def _cells(self, lat, lon):
+        x, y = mercator_pixels(lat, lon)
+        scale = 2 ** self.max_zoom / self.cell_px
+        return np.floor(x * scale).astype(np.int32), np.floor(y * scale).astype(np.int32)
+
+    # GeoJSON clusters of `rows` inside bbox = (west, south, east, north) at `zoom`
+    def clusters(self, rows, zoom, bbox):
+        rows = rows[self.valid[rows]]
+        west, south, east, north = bbox
+        shift = self.max_zoom - min(zoom, self.max_zoom)
+        (x0, x1), (y0, y1) = [np.right_shift(c, shift) for c in self._cells([north, south], [west, east])]
+        cx, cy = self.ix[rows] >> shift, self.iy[rows] >> shift
+        inside = (cx >= x0) & (cx <= x1) & (cy >= y0) & (cy <= y1)
+        rows, cx, cy = rows[inside], cx[inside] - x0, cy[inside] - y0
+
+        if zoom >= self.max_zoom:
+            return _feature_collection(self.lat[rows], self.lon[rows], np.ones(len(rows), dtype=np.int64))
+
+        cell_keys, cluster = np.unique(cx.astype(np.int64) * (y1 - y0 + 1) + cy, return_inverse=True)
+        counts = np.bincount(cluster, minlength=len(cell_keys))
+        lat = np.bincount(cluster, weights=self.lat[rows], minlength=len(cell_keys)) / np.maximum(counts, 1)
+        lon = np.bincount(cluster, weights=self.lon[rows], minlength=len(cell_keys)) / np.maximum(counts, 1)
+        return _feature_collection(lat, lon, counts)
+
+
+def _feature_collection(lat, lon, counts):
+    return {'type': 'FeatureCollection',
+            'features': [{'type': 'Feature',
+                          'geometry': {'type': 'Point', 'coordinates': [round(float(x), 6), round(float(y), 6)]},
+                          'properties': {'count': int(n)}}
+                         for y, x, n in zip(lat, lon, counts)]}
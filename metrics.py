@@ -0,0 +1,157 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+# histogram buckets for span durations (seconds) and serialized sizes (bytes)
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000)
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+class Metrics:
+    """Counters and histograms rendered in the Prometheus text format.
+
+    `span` times a block into the span_seconds histogram. Gauges are read at
+    render time from the registered callables, each returning
+    (name, labels dict, value) tuples.
+    """
+
+    def __init__(self, prefix='dashboard'):
+        self.prefix = prefix
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = []
+        self.lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = (buckets, [0] * len(buckets), [0.0, 0])
+            buckets, counts, totals = self.histograms[key]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            totals[0] += value
+            totals[1] += 1
+
+    @contextmanager
+    def span(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('span_seconds', time.perf_counter() - start, SECONDS_BUCKETS, span=name, **labels)
+
+    def register_gauges(self, read):
+        self.gauges.append(read)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(((key, (buckets, list(counts), list(totals)))
+                                 for key, (buckets, counts, totals) in self.histograms.items()), key=lambda item: item[0])
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f'{self.prefix}_{name}'
+            if metric not in typed:
+                lines.append(f'# TYPE {metric} counter')
+                typed.add(metric)
+            lines.append(f'{metric}{_label_text(labels)} {value}')
+        for (name, labels), (buckets, counts, (total, count)) in histograms:
+            metric = f'{self.prefix}_{name}'
+            if metric not in typed:
+                lines.append(f'# TYPE {metric} histogram')
+                typed.add(metric)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{_label_text(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{metric}_bucket{_label_text(labels + (("le", "+Inf"),))} {count}')
+            lines.append(f'{metric}_sum{_label_text(labels)} {total}')
+            lines.append(f'{metric}_count{_label_text(labels)} {count}')
+        for read in self.gauges:
+            for name, labels, value in read():
+                metric = f'{self.prefix}_{name}'
+                if metric not in typed:
+                    lines.append(f'# TYPE {metric} gauge')
+                    typed.add(metric)
+                lines.append(f'{metric}{_label_text(tuple(sorted(labels.items())))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """Samples the Python stacks of all other threads every `interval` seconds while running.
+
+    Stacks are counted in the collapsed format (frames joined by ';', outermost
+    first) read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.samples = 0
+        self.interval = 0.005
+        self.thread = None
+        self.running = threading.Event()
+        self.lock = threading.Lock()
+
+    def start(self, interval=0.005):
+        if self.running.is_set():
+            return False
+        with self.lock:
+            self.counts.clear()
+            self.samples = 0
+        self.interval = interval
+        self.running.set()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        return self.collapsed()
+
+    def _run(self):
+        own = threading.get_ident()
+        while self.running.is_set():
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(f'{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}')
+                    frame = frame.f_back
+                stacks.append(';'.join(reversed(stack)))
+            with self.lock:
+                self.counts.update(stacks)
+                self.samples += 1
+            time.sleep(self.interval)
+
+    def collapsed(self):
+        with self.lock:
+            return ''.join(f'{stack} {count}\n' for stack, count in self.counts.most_common())
+
+
+# shared by the dashboard modules
+metrics = Metrics()
+profiler = SamplingProfiler()
@@ -0,0 +1,68 @@
+import numpy as np
+
+
+# value at quantile q of every row of a (groups x values) count matrix, interpolated like pandas
+def quantile_rows(hist, values, q):
+    result = np.full(len(hist), np.nan)
+    cum = np.cumsum(hist, axis=1)
+    for i, row in enumerate(cum):
+        n = row[-1] if len(row) else 0
+        if n == 0:
+            continue
+        position = (n - 1) * q
+        below = np.floor(position)
+        lo = values[np.searchsorted(row, below, side='right')]
+        hi = values[np.searchsorted(row, np.ceil(position), side='right')]
+        result[i] = lo + (hi - lo) * (position - below)
+    return result
+
+
+# round every value to the representative of its logarithmic bucket (as in DDSketch),
+# which is within relative_error of the value
+def log_buckets(values, relative_error):
+    gamma = (1 + relative_error) / (1 - relative_error)
+    rounded = np.zeros_like(values)
+    nonzero = values != 0
+    index = np.ceil(np.log(np.abs(values[nonzero])) / np.log(gamma))
+    rounded[nonzero] = np.sign(values[nonzero]) * 2 * gamma ** index / (gamma + 1)
+    return rounded
+
+
+class CellQuantiles:
+    """Distribution of a value within every cube cell, mergeable over any set of cells.
+
+    The distributions are kept as (cell, value, count) triples, so merging the
+    cells of a selection is one bincount over their triples. Quantiles are exact
+    by default. With `relative_error` the values are first rounded to logarithmic
+    buckets, which leaves fewer distinct values and triples; every quantile is
+    then within that relative error of the exact one. `counts` weights every
+    (cell, value) pair, e.g. when merging the triples of several chunks.
+    """
+
+    def __init__(self, cells, values, n_cells, relative_error=None, counts=None):
+        values = np.asarray(values, dtype=float)
+        known = ~np.isnan(values)
+        cells, values = np.asarray(cells)[known], values[known]
+        counts = None if counts is None else np.asarray(counts)[known]
+        self.n_cells = n_cells
+        self.relative_error = relative_error
+        if relative_error:
+            values = log_buckets(values, relative_error)
+        self.values, codes = np.unique(values, return_inverse=True)
+        n_values = max(len(self.values), 1)
+        keys, triple = np.unique(cells * n_values + codes, return_inverse=True)
+        self.counts = np.bincount(triple, weights=counts, minlength=len(keys)).astype(np.int64)
+        self.cells = keys // n_values
+        self.codes = keys % n_values
+
+    # (groups x qs) quantiles of the cells in mask; cell_groups gives the group code of every cell
+    def quantiles(self, mask, qs, cell_groups=None, n_groups=1):
+        selected = mask[self.cells]
+        if cell_groups is None:
+            groups = np.zeros(np.count_nonzero(selected), dtype=np.int64)
+        else:
+            groups = cell_groups[self.cells[selected]]
+        n_values = len(self.values)
+        hist = np.bincount(groups * n_values + self.codes[selected], weights=self.counts[selected],
+                           minlength=n_groups * n_values).reshape(n_groups, n_values)
+        return np.column_stack([quantile_rows(hist, self.values, q) for q in qs])
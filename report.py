@@ -0,0 +1,150 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import plotly.io as pio
+from plotly.io.json import to_json_plotly
+
+from chart_pool import ChartPool
+from charts import CHART_STAGES, EARNINGS_VIEWS, PRICE_PERCENTILES, full_figure
+from datasets import Dataset
+from filters import parse_filters, filter_key
+
+REPORT_FORMATS = ['json', 'csv', 'png', 'svg']
+# per-bin aggregates written as csv, see CubeSelection.bin_stats
+REPORT_BINS = ['room_type', 'price_bin', 'term_rentals', 'minimum_nights_bin', 'last_1yr_availability']
+DEFAULT_VALUES = ['No', None, None, None, 'No']
+
+
+# (name, filter control values) of every report: json lines of control values in the order of
+# filter_inputs (e.g. a FILTER_LOG recording), or every area of the dropdown with default filters
+def report_specs(dataset, spec_path=None):
+    if spec_path:
+        with open(spec_path) as f:
+            specs = [json.loads(line) for line in f if line.strip()]
+    else:
+        specs = [[area] + DEFAULT_VALUES for area in [None] + dataset.neighbourhood_options]
+    # a recording repeats filter states (also as different but equivalent control values), each is reported once
+    unique = {}
+    for values in specs:
+        unique.setdefault(filter_key(parse_filters(*values)), values)
+    return [(report_name(key, values), values) for key, values in unique.items()]
+
+
+# the area for reading plus a short hash of the filter state, so distinct states never share a directory
+def report_name(key, values):
+    name = re.sub(r'[^A-Za-z0-9]+', '-', values[0] or 'all').strip('-').lower()
+    return name + '-' + hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()[:8]
+
+
+# every chart figure of one filter state plus its aggregates, built next to the cube (in a chart worker)
+def report_outputs(selection, values):
+    outputs = {}
+    for name, (chart, extra) in CHART_STAGES.items():
+        if name == 'stats':
+            continue
+        for view in EARNINGS_VIEWS if name == 'availability' else EARNINGS_VIEWS[:1]:
+            key = name if view == EARNINGS_VIEWS[0] else name + '_total'
+            outputs[key] = chart(selection, *extra(values, view))
+    quantiles = selection.quantiles(PRICE_PERCENTILES)
+    summary = {'listings': int(selection.total()), 'mean_price': float(selection.mean())}
+    summary.update({f'p{round(q * 100)}_price': float(price) for q, price in quantiles.items()})
+    return {'charts': outputs, 'summary': summary,
+            'tables': {dim: selection.bin_stats(dim) for dim in REPORT_BINS}}
+
+
+# files of one report under out_dir/name, returns their number
+def write_report(out_dir, name, values, report, formats):
+    path = os.path.join(out_dir, name)
+    os.makedirs(path, exist_ok=True)
+    written = 0
+    for chart, output in report['charts'].items():
+        figure, description = output if isinstance(output, tuple) else (output, None)
+        figure = full_figure(chart.replace('_total', ''), figure)
+        if 'json' in formats:
+            with open(os.path.join(path, chart + '.json'), 'w') as f:
+                f.write(to_json_plotly({'figure': figure, 'description': description}))
+            written += 1
+        for image in {'png', 'svg'} & set(formats):
+            pio.write_image(figure, os.path.join(path, f'{chart}.{image}'))
+            written += 1
+    if 'json' in formats:
+        with open(os.path.join(path, 'summary.json'), 'w') as f:
+            json.dump({'filters': values, **report['summary']}, f, indent=2)
+        written += 1
+    if 'csv' in formats:
+        for dim, table in report['tables'].items():
+            table.to_csv(os.path.join(path, dim + '.csv'))
+            written += 1
+    return written
+
+
+# builds the reports on `workers` chart processes (a thread of this process when 0) and writes each one
+# as soon as it is done; at most two reports per worker are pending, so memory does not grow with their number
+def run_reports(dataset, specs, out_dir, formats, workers=0):
+    pool = ChartPool(workers) if workers else None
+    threads = None if pool else ThreadPoolExecutor(1)
+
+    def submit(values):
+        filters = parse_filters(*values)
+        if pool:
+            return pool.submit(dataset.snapshot, report_outputs, filters, None, values)
+        return threads.submit(lambda: report_outputs(dataset.aggregator.selection(None, filters), values))
+
+    os.makedirs(out_dir, exist_ok=True)
+    summary_path = os.path.join(out_dir, 'summary.csv')
+    pending, queue, done = {}, list(specs), 0
+    start = time.perf_counter()
+    try:
+        with open(summary_path, 'w', newline='') as f:
+            summary = csv.writer(f)
+            while queue or pending:
+                while queue and len(pending) < 2 * max(workers, 1):
+                    name, values = queue.pop(0)
+                    pending[submit(values)] = (name, values)
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, values = pending.pop(future)
+                    report = future.result()
+                    files = write_report(out_dir, name, values, report, formats)
+                    if not done:
+                        summary.writerow(['report'] + list(report['summary']))
+                    summary.writerow([name] + list(report['summary'].values()))
+                    f.flush()
+                    done += 1
+                    print(json.dumps({'report': name, 'files': files, 'done': done, 'of': len(specs),
+                                      'seconds': round(time.perf_counter() - start, 2)}), flush=True)
+    finally:
+        if pool:
+            pool.close()
+        else:
+            threads.shutdown()
+    return done
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write the dashboard charts and aggregates of many filter states to disk.')
+    parser.add_argument('output', help='directory of the reports, one subdirectory per filter state')
+    parser.add_argument('--csv', default='listings.csv', help='listings snapshot')
+    parser.add_argument('--store', help='its columnar store, see data_store.py')
+    parser.add_argument('--specs', help='json lines of filter control values (e.g. a FILTER_LOG recording); '
+                                        'default: every area of the dropdown')
+    parser.add_argument('--formats', default='json,csv', help=f'comma separated, of {",".join(REPORT_FORMATS)}')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='chart worker processes, 0 for none')
+    args = parser.parse_args()
+
+    formats = args.formats.split(',')
+    if set(formats) - set(REPORT_FORMATS):
+        parser.error(f'unknown formats {set(formats) - set(REPORT_FORMATS)}')
+    if {'png', 'svg'} & set(formats) and pio.kaleido.scope is None:
+        sys.exit('png and svg reports need `pip install kaleido`')
+
+    dataset = Dataset('report', args.csv, args.store).build(share=args.workers > 0)
+    specs = report_specs(dataset, args.specs)
+    run_reports(dataset, specs, args.output, formats, args.workers)
@@ -0,0 +1,54 @@
+import numpy as np
+
+
+class SankeyEngine:
+    """Sankey flows between consecutive dimensions of a FilterCube.
+
+    Every value of every dimension has a fixed node index and every
+    (layer, source, target) combination a fixed link index, both computed once.
+    Per request the link values of all layers come from a single np.bincount of
+    the selected cells' link indices.
+    """
+
+    def __init__(self, cube, dims):
+        self.cube = cube
+        sizes = [len(cube.labels[dim]) for dim in dims]
+        node_offsets = np.concatenate([[0], np.cumsum(sizes)])
+        self.node_labels = np.array([label for dim in dims for label in cube.labels[dim]], dtype=object)
+
+        # cells with a missing value in any dimension are left out, like groupby does
+        self.usable = cube.not_missing(dims)
+
+        link_offsets = np.concatenate([[0], np.cumsum([a * b for a, b in zip(sizes[:-1], sizes[1:])])])
+        self.n_links = int(link_offsets[-1])
+        self.link_source = np.empty(self.n_links, dtype=np.int64)
+        self.link_target = np.empty(self.n_links, dtype=np.int64)
+        cell_links = []
+        for layer, (source, target) in enumerate(zip(dims[:-1], dims[1:])):
+            n_source, n_target = sizes[layer], sizes[layer + 1]
+            links = slice(link_offsets[layer], link_offsets[layer + 1])
+            self.link_source[links] = node_offsets[layer] + np.repeat(np.arange(n_source), n_target)
+            self.link_target[links] = node_offsets[layer + 1] + np.tile(np.arange(n_target), n_source)
+            codes = link_offsets[layer] + cube.cell_codes[source] * n_target + cube.cell_codes[target]
+            cell_links.append(np.where(self.usable, codes, 0))
+        # (layers x cells) link index of every cube cell
+        self.cell_links = np.vstack(cell_links) if cell_links else np.empty((0, cube.n_cells), dtype=np.int64)
+
+    # listing count of every link for the selected cells
+    def link_values(self, cells):
+        cells = cells & self.usable
+        links = self.cell_links[:, cells]
+        weights = np.broadcast_to(self.cube.cells['count'][cells], links.shape)
+        return np.rint(np.bincount(links.ravel(), weights=weights.ravel(), minlength=self.n_links)).astype(np.int64)
+
+    # node labels and (source, target, value) arrays of the non-empty links
+    def flows(self, values):
+        nonzero = np.flatnonzero(values)
+        source, target = self.link_source[nonzero], self.link_target[nonzero]
+
+        # renumber the nodes that carry a flow, keeping the fixed node order
+        used = np.zeros(len(self.node_labels), dtype=bool)
+        used[source] = True
+        used[target] = True
+        node_index = np.cumsum(used) - 1
+        return self.node_labels[used], node_index[source], node_index[target], values[nonzero]
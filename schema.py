@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+# dtype of every column kept in listings_df; other columns are dropped
+LISTINGS_SCHEMA = {
+    'id': 'int64',
+    'neighbourhood_group': 'category',
+    'neighbourhood': 'category',
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'room_type': 'category',
+    'price': 'float32',
+    'minimum_nights': 'float32',
+    'number_of_reviews': 'int32',
+    'availability_365': 'int16',
+    'host_is_superhost': 'category',
+    # derived columns
+    'minimum_nights_bin': 'category',
+    'price_bin': 'category',
+    'last_1yr_availability': 'category',
+    'term_rentals': 'category',
+    'reviewed': 'bool',
+    'sankey_term': 'category',
+    'sankey_price': 'category',
+    'sankey_superhost': 'category',
+}
+
+
+def _cast(series, dtype):
+    if dtype == 'category':
+        return series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+    # integer columns holding missing values stay floating point: float32 holds int16 values exactly,
+    # wider ones (ids, review counts) need float64, exact up to 2**53
+    if np.issubdtype(np.dtype(dtype), np.integer) and series.isna().any():
+        return series.astype('float32' if np.dtype(dtype).itemsize <= 2 else 'float64')
+    return series.astype(dtype)
+
+
+# compact listings_df: categoricals for string columns, narrow numerics, unused columns dropped
+def apply_schema(df, schema=LISTINGS_SCHEMA):
+    return pd.DataFrame({column: _cast(df[column], dtype) for column, dtype in schema.items() if column in df.columns})
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def memory_report(before, after):
+    return f"listings_df memory: {memory_mb(before):.1f} MB -> {memory_mb(after):.1f} MB"
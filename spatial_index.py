@@ -0,0 +1,64 @@
+import numpy as np
+
+
+class SpatialGrid:
+    """Uniform latitude/longitude grid over the listings.
+
+    Row positions are sorted by grid bucket, so the buckets of one grid row
+    inside a bounding box form a single contiguous slice. A viewport query only
+    touches the listings in (or next to) the viewport, whatever the total size.
+    """
+
+    def __init__(self, lat, lon, cells_per_degree=100, max_buckets=1_000_000):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        valid = np.flatnonzero(~(np.isnan(self.lat) | np.isnan(self.lon)))
+        if len(valid):
+            self.lat0, self.lon0 = self.lat[valid].min(), self.lon[valid].min()
+            height, width = self.lat[valid].max() - self.lat0, self.lon[valid].max() - self.lon0
+        else:
+            self.lat0 = self.lon0 = height = width = 0.0
+        # coarser cells for large extents so the bucket table stays bounded
+        self.cells_per_degree = min(cells_per_degree, np.sqrt(max_buckets / max(height * width, 1e-9)))
+        self.nx = int(width * self.cells_per_degree) + 1
+        self.ny = int(height * self.cells_per_degree) + 1
+
+        buckets = self._gy(self.lat[valid]) * self.nx + self._gx(self.lon[valid])
+        order = np.argsort(buckets, kind='stable')
+        self.rows = valid[order]
+        self.offsets = np.searchsorted(buckets[order], np.arange(self.nx * self.ny + 1))
+
+    def _gx(self, lon):
+        return np.clip(((np.asarray(lon) - self.lon0) * self.cells_per_degree).astype(np.int64), 0, self.nx - 1)
+
+    def _gy(self, lat):
+        return np.clip(((np.asarray(lat) - self.lat0) * self.cells_per_degree).astype(np.int64), 0, self.ny - 1)
+
+    # row positions inside bbox = (west, south, east, north)
+    def rows_in_bbox(self, bbox):
+        west, south, east, north = bbox
+        if east < self.lon0 or north < self.lat0 or west > self.lon0 + self.nx / self.cells_per_degree \
+                or south > self.lat0 + self.ny / self.cells_per_degree:
+            return np.empty(0, dtype=np.int64)
+        gx0, gx1 = self._gx(west), self._gx(east)
+        gy0, gy1 = self._gy(south), self._gy(north)
+        candidates = np.concatenate([self.rows[self.offsets[gy * self.nx + gx0]:self.offsets[gy * self.nx + gx1 + 1]]
+                                     for gy in range(gy0, gy1 + 1)] or [np.empty(0, dtype=np.int64)])
+        lat, lon = self.lat[candidates], self.lon[candidates]
+        return np.sort(candidates[(lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)])
+
+    # count, medians and a point sample of the `selected` rows inside bbox
+    def query(self, bbox, selected, values=None, sample_size=100):
+        rows = self.rows_in_bbox(bbox)
+        rows = rows[selected(rows)]
+        result = {'count': int(len(rows)),
+                  'median_lat': float(np.median(self.lat[rows])) if len(rows) else None,
+                  'median_lon': float(np.median(self.lon[rows])) if len(rows) else None}
+        for name, column in (values or {}).items():
+            column_values = np.asarray(column[rows], dtype=float)
+            column_values = column_values[~np.isnan(column_values)]
+            result[f'median_{name}'] = float(np.median(column_values)) if len(column_values) else None
+        # evenly spaced sample, stable for the same viewport and filters
+        sample = rows[np.linspace(0, len(rows) - 1, min(sample_size, len(rows))).astype(np.int64)] if len(rows) else rows
+        result['sample'] = [[round(float(self.lat[r]), 6), round(float(self.lon[r]), 6)] for r in sample]
+        return result
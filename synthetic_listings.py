@@ -0,0 +1,72 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from features import categorical
+
+# share of listings, approximate centre and number of neighbourhoods of every borough
+BOROUGHS = {'Manhattan': (0.44, 40.78, -73.97, 32),
+            'Brooklyn': (0.39, 40.66, -73.95, 48),
+            'Queens': (0.13, 40.72, -73.83, 51),
+            'Bronx': (0.03, 40.84, -73.88, 48),
+            'Staten Island': (0.01, 40.58, -74.14, 43)}
+ROOM_TYPES = {'Entire home/apt': (0.55, 5.2), 'Private room': (0.41, 4.4), 'Shared room': (0.02, 4.0), 'Hotel room': (0.02, 5.4)}
+BOROUGH_PRICE = {'Manhattan': 1.35, 'Brooklyn': 1.0, 'Queens': 0.85, 'Bronx': 0.8, 'Staten Island': 0.85}
+MINIMUM_NIGHTS = {1: 0.12, 2: 0.1, 3: 0.07, 4: 0.03, 5: 0.03, 7: 0.03, 14: 0.02, 30: 0.45, 31: 0.03, 60: 0.03,
+                  90: 0.04, 120: 0.01, 180: 0.02, 365: 0.02}
+
+
+# synthetic listings with the columns of the Inside Airbnb file: neighbourhoods follow a Zipf-like
+# skew within their borough, prices are log-normal by room type and borough, and availability,
+# reviews and minimum nights are clumped like the real data
+def generate_listings(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    groups, neighbourhoods, centres, weights = [], [], [], []
+    for group, (share, lat, lon, count) in BOROUGHS.items():
+        rank_weights = 1 / np.arange(1, count + 1) ** 1.1
+        for i in range(count):
+            groups.append(group)
+            neighbourhoods.append(f'{group} {i + 1:02d}')
+            centres.append((lat + rng.normal(0, 0.03), lon + rng.normal(0, 0.03)))
+            weights.append(share * rank_weights[i] / rank_weights.sum())
+    weights = np.array(weights) / np.sum(weights)
+    group_codes = np.array([list(BOROUGHS).index(group) for group in groups])
+    centres = np.array(centres)
+    area = rng.choice(len(neighbourhoods), n_rows, p=weights)
+
+    room_names = list(ROOM_TYPES)
+    room = rng.choice(len(room_names), n_rows, p=[share for share, _ in ROOM_TYPES.values()])
+    log_price = np.array([mu for _, mu in ROOM_TYPES.values()])[room] + \
+                np.log(np.array([BOROUGH_PRICE[group] for group in groups]))[area] + rng.normal(0, 0.55, n_rows)
+    price = np.clip(np.round(np.exp(log_price)), 10, 20000)
+    price[rng.random(n_rows) < 0.03] = np.nan
+
+    nights = np.array(list(MINIMUM_NIGHTS), dtype=float)
+    minimum_nights = rng.choice(nights, n_rows, p=np.array(list(MINIMUM_NIGHTS.values())) / sum(MINIMUM_NIGHTS.values()))
+    availability = np.where(rng.random(n_rows) < 0.3, 0, rng.integers(0, 366, n_rows))
+    reviews = np.where(rng.random(n_rows) < 0.25, 0, rng.geometric(0.04, n_rows))
+    superhost = rng.choice(3, n_rows, p=[0.2, 0.7, 0.1])
+
+    return pd.DataFrame({
+        'id': np.arange(n_rows, dtype=np.int64) * 13 + 2595,
+        'neighbourhood_group': categorical(group_codes[area], list(BOROUGHS)),
+        'neighbourhood': categorical(area, neighbourhoods),
+        'latitude': centres[area, 0] + rng.normal(0, 0.008, n_rows),
+        'longitude': centres[area, 1] + rng.normal(0, 0.008, n_rows),
+        'room_type': categorical(room, room_names),
+        'price': price,
+        'minimum_nights': minimum_nights,
+        'number_of_reviews': reviews,
+        'availability_365': availability,
+        'host_is_superhost': categorical(np.where(superhost == 2, -1, superhost), ['t', 'f']),
+    })
+
+
+# python synthetic_listings.py 1000000 synthetic_listings.csv [seed]
+if __name__ == '__main__':
+    n_rows = int(sys.argv[1])
+    path = sys.argv[2] if len(sys.argv) > 2 else 'synthetic_listings.csv'
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    generate_listings(n_rows, seed).to_csv(path, index=False)
+    print(f'wrote {n_rows} listings to {path}')
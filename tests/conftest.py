@@ -0,0 +1,46 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datasets import CUBE_DIMS, CUBE_HISTOGRAMS, Dataset  # noqa: E402
+from features import derive_features  # noqa: E402
+from filter_cube import FilterCube  # noqa: E402
+from schema import apply_schema  # noqa: E402
+from synthetic_listings import generate_listings  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def listings_df():
+    return apply_schema(derive_features(generate_listings(20000, seed=7)))
+
+
+@pytest.fixture(scope='session')
+def cube(listings_df):
+    return FilterCube(listings_df, CUBE_DIMS, CUBE_HISTOGRAMS)
+
+
+@pytest.fixture(scope='session')
+def dataset(listings_df):
+    return Dataset('synthetic', 'synthetic').build(listings_df=listings_df)
+
+
+# random {dimension: allowed values} filters over a few of the filter dimensions
+def random_filters(rng, cube, dims=('neighbourhood_group', 'room_type', 'price_bin', 'host_is_superhost', 'term_rentals')):
+    filters = {}
+    for dim in dims:
+        if rng.random() < 0.5:
+            labels = cube.labels[dim]
+            filters[dim] = list(rng.choice(labels, rng.integers(1, len(labels) + 1), replace=False))
+    return filters
+
+
+# rows of a listings frame matching a {column: allowed values} filter
+def filtered(df, filters):
+    mask = np.ones(len(df), dtype=bool)
+    for column, values in filters.items():
+        mask &= df[column].isin(values).to_numpy()
+    return df[mask]
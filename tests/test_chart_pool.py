@@ -0,0 +1,97 @@
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+from plotly.io.json import to_json_plotly
+
+from chart_pool import ChartPool, ChartScheduler, SharedSnapshot
+from charts import sankey_chart, room_type_chart, area_price_chart, availability_chart, EARNINGS_VIEWS
+from conftest import random_filters
+from datasets import SANKEY_DIMS
+from filter_cube import CubeSelection
+from sankey_engine import SankeyEngine
+
+
+# runs scheduler.run(slot, ...) for a build returning `value` on a caller thread
+def request(callers, scheduler, executor, slot, value, build=None):
+    return callers.submit(scheduler.run, slot, lambda: executor.submit(build or (lambda: value)))
+
+
+def wait_pending(scheduler, slot):
+    while slot not in scheduler.pending:
+        time.sleep(0.01)
+
+
+def test_queued_build_is_cancelled_by_a_newer_request_of_the_same_slot():
+    scheduler = ChartScheduler()
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 'running'
+
+    with ThreadPoolExecutor(1) as executor, ThreadPoolExecutor(8) as callers:
+        # keeps the only build thread busy, so the builds below stay queued
+        running = request(callers, scheduler, executor, ('session', 'sankey'), None, slow)
+        started.wait(5)
+        old = request(callers, scheduler, executor, ('session', 'room_type'), 'old')
+        other = request(callers, scheduler, executor, ('other', 'room_type'), 'other')
+        unslotted = request(callers, scheduler, executor, None, 'unslotted')
+        wait_pending(scheduler, ('session', 'room_type'))
+        wait_pending(scheduler, ('other', 'room_type'))
+        new = request(callers, scheduler, executor, ('session', 'room_type'), 'new')
+        while scheduler.cancelled < 1:
+            time.sleep(0.01)
+        release.set()
+
+        with pytest.raises(CancelledError):
+            old.result(5)
+        assert new.result(5) == 'new' and other.result(5) == 'other' and unslotted.result(5) == 'unslotted'
+        assert running.result(5) == 'running'
+    assert scheduler.cancelled == 1 and not scheduler.pending
+
+
+def test_running_build_is_not_interrupted():
+    scheduler = ChartScheduler()
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 'first'
+
+    with ThreadPoolExecutor(2) as executor, ThreadPoolExecutor(2) as callers:
+        first = request(callers, scheduler, executor, ('session', 'sankey'), None, slow)
+        started.wait(5)
+        second = request(callers, scheduler, executor, ('session', 'sankey'), 'second')
+        assert second.result(5) == 'second'
+        release.set()
+        assert first.result(5) == 'first'
+    assert scheduler.cancelled == 0
+
+
+def test_pool_builds_the_same_charts_as_in_process(cube):
+    sankey = SankeyEngine(cube, SANKEY_DIMS)
+    snapshot = SharedSnapshot((cube, sankey))
+    pool = ChartPool(2)
+    try:
+        rng = np.random.default_rng(4)
+        for _ in range(5):
+            filters = random_filters(rng, cube)
+            selection = CubeSelection(cube, cube.cell_mask(filters), sankey)
+            for chart, args in [(sankey_chart, ()), (room_type_chart, ()), (area_price_chart, (None,)),
+                                (availability_chart, (EARNINGS_VIEWS[0],)), (availability_chart, (EARNINGS_VIEWS[1],))]:
+                built = pool.submit(snapshot, chart, filters, None, *args).result(30)
+                assert to_json_plotly(built) == to_json_plotly(chart(selection, *args)), chart.__name__
+    finally:
+        pool.close()
+        names = [block.name for block in snapshot.blocks]
+        snapshot.close()
+    assert names and not snapshot.blocks
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
@@ -0,0 +1,8 @@
+import json
+
+from charts import FIGURE_TEMPLATES, figure_templates
+
+
+# figure_templates.json is the output of figure_templates(), rewrite it with `python charts.py`
+def test_prebuilt_figure_templates_are_current():
+    assert json.loads(json.dumps(figure_templates())) == FIGURE_TEMPLATES
@@ -0,0 +1,48 @@
+import gzip
+import json
+import struct
+
+import numpy as np
+
+from client_cube import CLIENT_DIMS, compressed_snapshot
+
+
+# header and arrays of the payload, read the way assets/client_charts.js reads it
+def decode(body):
+    data = gzip.decompress(body)
+    (header_length,) = struct.unpack_from('<I', data)
+    header = json.loads(data[4:4 + header_length])
+    start = 4 + header_length
+    assert start % 8 == 0
+
+    def array(descriptor):
+        assert descriptor['offset'] % 8 == 0
+        dtype = np.dtype(descriptor['dtype']).newbyteorder('<')
+        return np.frombuffer(data, dtype, descriptor['length'], start + descriptor['offset'])
+    return header, array
+
+
+def test_snapshot_round_trips_the_cube(cube):
+    body, etag = compressed_snapshot(cube)
+    assert compressed_snapshot(cube)[1] == etag
+    header, array = decode(body)
+
+    assert header['n_cells'] == cube.n_cells
+    for dim in CLIENT_DIMS:
+        assert header['dims'][dim]['labels'] == json.loads(json.dumps(cube.labels[dim], default=lambda v: v.item()))
+        np.testing.assert_array_equal(array(header['dims'][dim]['codes']), cube.cell_codes[dim])
+    for name, values in cube.cells.items():
+        np.testing.assert_array_equal(array(header['cells'][name]), values)
+
+    for dim, measures in cube.histograms.items():
+        histogram = header['histograms'][dim]
+        assert histogram['labels'] == cube.hist_labels[dim]
+        cells, bins = array(histogram['cells']), array(histogram['bins'])
+        for name, matrix in measures.items():
+            dense = np.zeros_like(matrix)
+            dense[cells, bins] = array(histogram['measures'][name])
+            np.testing.assert_array_equal(dense, matrix)
+
+    quantiles = cube.price_quantiles
+    for name in ['values', 'cells', 'codes', 'counts']:
+        np.testing.assert_array_equal(array(header['quantiles'][name]), getattr(quantiles, name))
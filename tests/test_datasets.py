@@ -0,0 +1,56 @@
+import numpy as np
+
+from bitmap_index import BitmapIndex, BitmapBuilder
+from data_store import csv_chunks, read_listings_csv, ingest_csv, open_store
+from datasets import CUBE_DIMS, CUBE_HISTOGRAMS, MAP_FILTER_COLUMNS
+from features import derive_features
+from filter_cube import FilterCube, CubeBuilder
+from schema import apply_schema
+from synthetic_listings import generate_listings
+
+
+def test_chunked_build_matches_whole_frame(tmp_path):
+    raw_df = generate_listings(5000, seed=3)
+    raw_df.loc[raw_df.sample(frac=0.02, random_state=1).index, 'price'] = np.nan
+    raw_df.to_csv(tmp_path / 'listings.csv', index=False)
+    listings_df = apply_schema(derive_features(read_listings_csv(tmp_path / 'listings.csv')))
+
+    # every csv chunk is prepared alone, so the chunks have different categories
+    cube_builder, bitmap_builder = CubeBuilder(CUBE_DIMS, CUBE_HISTOGRAMS), BitmapBuilder(MAP_FILTER_COLUMNS)
+    for chunk in csv_chunks(tmp_path / 'listings.csv', 1024):
+        cube_builder.add(chunk)
+        bitmap_builder.add(chunk)
+
+    for relative_error in (None, 0.01):
+        cube = FilterCube(listings_df, CUBE_DIMS, CUBE_HISTOGRAMS, relative_error=relative_error)
+        chunked = FilterCube.from_builder(cube_builder, relative_error)
+        assert chunked.labels == cube.labels and chunked.hist_labels == cube.hist_labels
+        for dim in CUBE_DIMS:
+            np.testing.assert_array_equal(chunked.cell_codes[dim], cube.cell_codes[dim])
+        for name, values in cube.cells.items():
+            np.testing.assert_array_equal(chunked.cells[name], values)
+        for dim, measures in cube.histograms.items():
+            for name, matrix in measures.items():
+                np.testing.assert_array_equal(chunked.histograms[dim][name], matrix)
+        for name in ['values', 'cells', 'codes', 'counts']:
+            np.testing.assert_array_equal(getattr(chunked.price_quantiles, name), getattr(cube.price_quantiles, name))
+
+    bitmaps = BitmapIndex(listings_df, MAP_FILTER_COLUMNS)
+    chunked = BitmapIndex.from_builder(bitmap_builder)
+    for column, column_bitmaps in bitmaps.bitmaps.items():
+        assert list(chunked.bitmaps[column]) == list(column_bitmaps)
+        for label, bitmap in column_bitmaps.items():
+            np.testing.assert_array_equal(chunked.bitmaps[column][label], bitmap)
+
+
+def test_ingest_keeps_ids_of_chunks_with_missing_values(tmp_path):
+    raw_df = generate_listings(3000, seed=4)
+    raw_df['id'] = 50_000_000_000 + np.arange(len(raw_df)) * 7
+    raw_df['id'] = raw_df['id'].astype(float)
+    raw_df.loc[1500, 'id'] = np.nan
+    raw_df.to_csv(tmp_path / 'listings.csv', index=False, float_format='%.0f')
+    ingest_csv(tmp_path / 'listings.csv', tmp_path / 'store', 1000)
+
+    ids = open_store(tmp_path / 'store')['id'].to_numpy()
+    assert ids.dtype == np.float64
+    np.testing.assert_array_equal(ids, raw_df['id'].to_numpy())
@@ -0,0 +1,63 @@
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from figure_cache import FigureCache
+
+
+def test_concurrent_misses_compute_once():
+    cache = FigureCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'figure': 'value'}
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(cache.get_or_compute, 'key', compute)]
+        started.wait(5)
+        futures += [pool.submit(cache.get_or_compute, 'key', compute) for _ in range(7)]
+        while cache.coalesced < 7:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert cache.stats()['misses'] == 1 and cache.stats()['coalesced'] == 7
+
+
+def test_failed_computation_is_not_cached():
+    cache = FigureCache()
+
+    def fail():
+        raise ValueError('bad filter')
+
+    for _ in range(2):
+        try:
+            cache.get_or_compute('key', fail)
+        except ValueError:
+            pass
+    assert cache.stats()['misses'] == 2 and not cache.in_flight
+    assert cache.get_or_compute('key', lambda: 1) == 1
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    value = 'x' * 1000
+    size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    cache = FigureCache(max_bytes=3 * size)
+    for key in 'abc':
+        cache.get_or_compute(key, lambda: value)
+    # a hit makes 'a' the most recently used
+    cache.get_or_compute('a', lambda: None)
+    cache.get_or_compute('d', lambda: value)
+    assert list(cache.entries) == ['c', 'a', 'd']
+    cache.get_or_compute('e', lambda: value)
+    assert list(cache.entries) == ['a', 'd', 'e']
+    assert cache.stats()['evictions'] == 2 and cache.size == 3 * size
+    # an entry larger than the whole budget is returned but not kept
+    assert cache.get_or_compute('big', lambda: value * 4) == value * 4
+    assert 'big' not in cache.entries
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from conftest import random_filters, filtered
+from filter_cube import CubeSelection
+
+
+def test_cube_matches_pandas(listings_df, cube):
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        filters = random_filters(rng, cube)
+        df = filtered(listings_df, filters)
+        selection = CubeSelection(cube, cube.cell_mask(filters))
+
+        assert selection.total() == len(df)
+        expected = df.groupby('room_type', observed=True).size()
+        pd.testing.assert_series_equal(selection.counts('room_type'), expected[expected > 0],
+                                       check_names=False, check_index_type=False, check_categorical=False)
+        if not len(df):
+            continue
+
+        booked = df.groupby('last_1yr_availability', observed=False)
+        stats = selection.bin_stats('last_1yr_availability')
+        np.testing.assert_array_equal(stats['count'].to_numpy(), booked.size().to_numpy())
+        np.testing.assert_allclose(stats['price'].to_numpy(), booked['price'].sum().to_numpy(), rtol=1e-6)
+        earnings = (df['price'].astype(float) * (365 - df['availability_365'])).fillna(0)
+        np.testing.assert_allclose(stats['earnings'].to_numpy(),
+                                   earnings.groupby(df['last_1yr_availability'], observed=False).sum().to_numpy(),
+                                   rtol=1e-6)
+
+        assert np.isclose(selection.mean(), df['price'].mean())
+        assert np.isclose(selection.median(), df['price'].median())
+        medians = selection.median(by='neighbourhood_group')
+        expected = df.groupby('neighbourhood_group', observed=True)['price'].median().dropna()
+        np.testing.assert_allclose(medians.dropna().to_numpy(), expected.to_numpy())
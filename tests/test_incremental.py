@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from conftest import random_filters
+from filter_cube import CubeSelection
+from incremental import IncrementalAggregator
+
+
+def test_delta_updates_match_full_aggregation(cube):
+    rng = np.random.default_rng(1)
+    aggregator = IncrementalAggregator(cube)
+    for _ in range(300):
+        filters = random_filters(rng, cube)
+        selection = aggregator.selection('session', filters)
+        expected = CubeSelection(cube, cube.cell_mask(filters))
+        assert selection.aggregates.keys() == expected.aggregates.keys()
+        for key, value in expected.aggregates.items():
+            np.testing.assert_allclose(selection.aggregates[key], value, atol=1e-6, err_msg=str(key))
+    assert aggregator.delta_updates > 0 and aggregator.full_updates > 0
+    assert aggregator.delta_updates + aggregator.full_updates <= 300
+
+
+def test_session_selection_is_shared(cube):
+    aggregator = IncrementalAggregator(cube)
+    filters = {'room_type': ['Private room']}
+    first = aggregator.selection('session', filters)
+    assert aggregator.selection('session', {'room_type': ['Private room']}) is first
+    assert aggregator.full_updates == 1
+
+
+def test_concurrent_requests_compute_one_selection(cube):
+    aggregator = IncrementalAggregator(cube)
+    rng = np.random.default_rng(2)
+    with ThreadPoolExecutor(8) as pool:
+        for _ in range(20):
+            filters = random_filters(rng, cube)
+            selections = list(pool.map(lambda _: aggregator.selection('session', filters), range(8)))
+            assert all(selection is selections[0] for selection in selections)
+    assert aggregator.delta_updates + aggregator.full_updates <= 20
+
+
+def test_filter_trace_is_recorded_once_per_filter_change(cube):
+    aggregator = IncrementalAggregator(cube)
+    filters = {'room_type': ['Private room'], 'price_bin': ['<100']}
+    first, second = [], []
+    aggregator.selection('session', filters, first)
+    aggregator.selection('session', filters, second)
+    assert [column for column, _, _ in first] == ['room_type', 'price_bin']
+    assert first[0][1] == cube.cells['count'].sum() and first[-1][2] == aggregator.selection('session', filters).total()
+    assert second == []
@@ -0,0 +1,32 @@
+import numpy as np
+
+from conftest import random_filters, filtered
+
+
+def test_cluster_counts_add_up_to_the_filtered_rows_in_bbox(listings_df, dataset):
+    lat = listings_df['latitude'].to_numpy(dtype=float)
+    lon = listings_df['longitude'].to_numpy(dtype=float)
+    rng = np.random.default_rng(5)
+    for _ in range(20):
+        filters = random_filters(rng, dataset.cube)
+        rows = filtered(listings_df.reset_index(drop=True), filters).index.to_numpy()
+        west, east = np.sort(rng.uniform(lon.min(), lon.max(), 2))
+        south, north = np.sort(rng.uniform(lat.min(), lat.max(), 2))
+        bbox = (west, south, east, north)
+        expected = np.count_nonzero((lat[rows] >= south) & (lat[rows] <= north) &
+                                    (lon[rows] >= west) & (lon[rows] <= east))
+        for zoom in range(0, dataset.grid.max_zoom + 2):
+            features = dataset.map_clusters(filters, zoom, bbox)['features']
+            assert sum(feature['properties']['count'] for feature in features) == expected, (filters, bbox, zoom)
+            for feature in features:
+                x, y = feature['geometry']['coordinates']
+                assert west - 1e-6 <= x <= east + 1e-6 and south - 1e-6 <= y <= north + 1e-6
+            if zoom >= dataset.grid.max_zoom:
+                assert all(feature['properties']['count'] == 1 for feature in features)
+
+
+def test_coarser_zooms_merge_clusters(dataset):
+    lat, lon = dataset.coords[:, 0], dataset.coords[:, 1]
+    bbox = (float(lon.min()), float(lat.min()), float(lon.max()), float(lat.max()))
+    sizes = [len(dataset.map_clusters({}, zoom, bbox)['features']) for zoom in range(0, 15)]
+    assert sizes == sorted(sizes) and sizes[0] < sizes[-1]
@@ -0,0 +1,20 @@
+import json
+
+from report import report_specs
+
+
+def test_specs_are_deduplicated_by_filter_state(tmp_path):
+    specs = [
+        ['Manhattan | Harlem', 'No', ['Private room', 'Entire home/apt'], None, None, 'No'],
+        ['Manhattan | Harlem', 'No', ['Entire home/apt', 'Private room'], [], 'Any', None],
+        ['Manhattan | Harlem', 'Yes', None, None, None, 'No'],
+        ['St. George', 'No', None, None, None, 'No'],
+        ['St George', 'No', None, None, None, 'No'],
+    ]
+    path = tmp_path / 'specs.jsonl'
+    path.write_text(''.join(json.dumps(values) + '\n' for values in specs))
+    reports = report_specs(None, path)
+    assert [values for _, values in reports] == [specs[0], specs[2], specs[3], specs[4]]
+    names = [name for name, _ in reports]
+    assert len(set(names)) == len(names)
+    assert all(name.startswith(('manhattan-harlem-', 'st-george-')) for name in names)
@@ -0,0 +1,12 @@
+import numpy as np
+import pandas as pd
+
+from schema import apply_schema
+
+
+def test_integer_columns_with_missing_values_keep_their_values():
+    df = apply_schema(pd.DataFrame({'id': [12345678901, None], 'number_of_reviews': [16777217, None],
+                                    'availability_365': [365, None]}))
+    assert df['id'].dtype == np.float64 and df['id'][0] == 12345678901
+    assert df['number_of_reviews'].dtype == np.float64 and df['number_of_reviews'][0] == 16777217
+    assert df['availability_365'].dtype == np.float32 and df['availability_365'][0] == 365
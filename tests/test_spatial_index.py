@@ -0,0 +1,56 @@
+import numpy as np
+
+from spatial_index import SpatialGrid
+
+
+def brute_force(lat, lon, bbox):
+    west, south, east, north = bbox
+    return np.flatnonzero((lat >= south) & (lat <= north) & (lon >= west) & (lon <= east))
+
+
+def test_rows_in_bbox_match_a_brute_force_scan(listings_df):
+    lat = listings_df['latitude'].to_numpy(dtype=float)
+    lon = listings_df['longitude'].to_numpy(dtype=float)
+    grid = SpatialGrid(lat, lon)
+    rng = np.random.default_rng(3)
+    bboxes = []
+    for _ in range(100):
+        west, east = np.sort(rng.uniform(lon.min() - 0.05, lon.max() + 0.05, 2))
+        south, north = np.sort(rng.uniform(lat.min() - 0.05, lat.max() + 0.05, 2))
+        bboxes.append((west, south, east, north))
+    # edges exactly on grid cell boundaries and on listings
+    step = 1 / grid.cells_per_degree
+    bboxes.append((grid.lon0 + 3 * step, grid.lat0 + 5 * step, grid.lon0 + 9 * step, grid.lat0 + 12 * step))
+    bboxes.append((lon[0], lat[0], lon[0], lat[0]))
+    bboxes.append((lon.min(), lat.min(), lon.max(), lat.max()))
+    for bbox in bboxes:
+        np.testing.assert_array_equal(grid.rows_in_bbox(bbox), brute_force(lat, lon, bbox), err_msg=str(bbox))
+    assert 0 in grid.rows_in_bbox(bboxes[-2])
+
+
+def test_empty_bbox(listings_df):
+    lat = listings_df['latitude'].to_numpy(dtype=float)
+    lon = listings_df['longitude'].to_numpy(dtype=float)
+    grid = SpatialGrid(lat, lon)
+    # outside the listings, and inside their extent but between two listings
+    assert len(grid.rows_in_bbox((10.0, 10.0, 11.0, 11.0))) == 0
+    west = np.sort(lon)[len(lon) // 2]
+    assert len(grid.rows_in_bbox((west + 1e-12, lat.min(), west + 2e-12, lat.max()))) == 0
+    stats = grid.query((10.0, 10.0, 11.0, 11.0), lambda rows: np.ones(len(rows), dtype=bool),
+                       values={'price': listings_df['price'].to_numpy()})
+    assert stats == {'count': 0, 'median_lat': None, 'median_lon': None, 'median_price': None, 'sample': []}
+
+
+def test_query_medians_and_sample(listings_df):
+    lat = listings_df['latitude'].to_numpy(dtype=float)
+    lon = listings_df['longitude'].to_numpy(dtype=float)
+    prices = listings_df['price'].to_numpy()
+    grid = SpatialGrid(lat, lon)
+    bbox = (np.percentile(lon, 20), np.percentile(lat, 20), np.percentile(lon, 70), np.percentile(lat, 80))
+    expected = brute_force(lat, lon, bbox)
+    expected = expected[prices[expected] > 100]
+    stats = grid.query(bbox, lambda rows: prices[rows] > 100, values={'price': prices})
+    assert stats['count'] == len(expected)
+    assert np.isclose(stats['median_lat'], np.median(lat[expected]))
+    assert np.isclose(stats['median_price'], np.nanmedian(prices[expected]))
+    assert len(stats['sample']) == 100
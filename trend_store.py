@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import pickle
+import threading
+
+from data_store import load_listings
+from datasets import CUBE_HISTOGRAMS
+from figure_cache import file_fingerprint
+from filter_cube import FilterCube, CubeSelection
+
+# filter dimensions of the dashboard kept per snapshot, so trends follow the same filters
+TREND_DIMS = ['neighbourhood_group', 'neighbourhood', 'host_is_superhost', 'room_type', 'price_bin',
+              'term_rentals', 'reviewed']
+# price quantiles of the stored snapshots are approximate, within this relative error, to keep them compact
+TREND_QUANTILE_ERROR = 0.01
+
+
+class TrendStore:
+    """Pre-aggregated listings of many snapshots (e.g. monthly dumps) for trend charts.
+
+    Every snapshot is reduced once to a FilterCube over the dashboard filters and
+    saved as its own file, so adding a snapshot never touches the others and a
+    trend only merges the cells of each stored cube.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.cubes = {}
+        self.entries = {}
+        self.version = None
+        self.lock = threading.Lock()
+
+    def _meta_path(self):
+        return os.path.join(self.path, 'meta.json')
+
+    def read_meta(self):
+        try:
+            with open(self._meta_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'snapshots': {}}
+
+    # aggregate a listings DataFrame as the snapshot of `date` (YYYY-MM-DD)
+    def add(self, date, listings_df, source=None):
+        cube = FilterCube(listings_df, TREND_DIMS, CUBE_HISTOGRAMS, relative_error=TREND_QUANTILE_ERROR)
+        os.makedirs(self.path, exist_ok=True)
+        file_name = f'{date}.pkl'
+        with open(os.path.join(self.path, file_name), 'wb') as f:
+            pickle.dump(cube, f, protocol=pickle.HIGHEST_PROTOCOL)
+        meta = self.read_meta()
+        meta['snapshots'][date] = {'file': file_name, 'source': file_fingerprint(source) if source else None}
+        tmp_path = self._meta_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, default=str)
+        os.replace(tmp_path, self._meta_path())
+
+    # whether `date` is stored from this version of the source file
+    def has(self, date, source):
+        entry = self.read_meta()['snapshots'].get(date)
+        fingerprint = file_fingerprint(source)
+        return entry is not None and fingerprint is not None and entry['source'] == list(fingerprint)
+
+    # {date: cube} of every stored snapshot, reread only when snapshots were added
+    def load(self):
+        version = file_fingerprint(self._meta_path())
+        with self.lock:
+            if version != self.version:
+                snapshots = self.read_meta()['snapshots']
+                cubes = {}
+                for date, entry in sorted(snapshots.items()):
+                    if self.entries.get(date) == entry:
+                        cubes[date] = self.cubes[date]
+                    else:
+                        with open(os.path.join(self.path, entry['file']), 'rb') as f:
+                            cubes[date] = pickle.load(f)
+                self.cubes = cubes
+                self.entries = snapshots
+                self.version = version
+            return self.cubes
+
+    # (date, CubeSelection) of every snapshot for a {column: allowed values} filter, oldest first
+    def selections(self, filters):
+        return [(date, CubeSelection(cube, cube.cell_mask(filters))) for date, cube in self.load().items()]
+
+
+# add a snapshot: python trend_store.py trends 2024-03-01 listings-2024-03.csv
+if __name__ == '__main__':
+    store_path, date, csv_path = sys.argv[1:4]
+    store = TrendStore(store_path)
+    if store.has(date, csv_path):
+        print(f'{date} is already stored from {csv_path}')
+    else:
+        store.add(date, load_listings(csv_path), source=csv_path)
+        print(f'added {date} to {store_path}')
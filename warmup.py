@@ -0,0 +1,91 @@
+import argparse
+import json
+import time
+from collections import Counter
+
+from filters import parse_filters, filter_key
+
+# the dropdown filter space warmed by default: every area (and none) x superhost x term,
+# the other controls at their defaults
+SUPERHOST_OPTIONS = ['No', 'Yes']
+TERM_OPTIONS = [None, 'Short Term', 'Long Term']
+
+
+def filter_space(neighbourhood_options):
+    return [[area, superhost, None, None, term, 'No']
+            for area in [None] + list(neighbourhood_options)
+            for superhost in SUPERHOST_OPTIONS
+            for term in TERM_OPTIONS]
+
+
+def state_key(values):
+    return filter_key(parse_filters(*values))
+
+
+# requests per normalised filter state in a FILTER_LOG recording, and the control values seen for each
+def traffic_weights(path):
+    weights, examples = Counter(), {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                values = json.loads(line)
+                key = state_key(values)
+                weights[key] += 1
+                examples.setdefault(key, values)
+    return weights, examples
+
+
+# filter control values to warm, most requested first when a traffic log is given; logged states
+# outside the dropdown space are warmed too. Equivalent control values are warmed once
+def warmup_plan(neighbourhood_options, log_path=None, limit=None):
+    weights, examples = traffic_weights(log_path) if log_path else (Counter(), {})
+    plan = {}
+    for values in list(examples.values()) + filter_space(neighbourhood_options):
+        plan.setdefault(state_key(values), values)
+    ordered = sorted(plan.items(), key=lambda item: -weights[item[0]])
+    if limit:
+        ordered = ordered[:limit]
+    return [values for _, values in ordered], weights
+
+
+# builds every planned filter state with `warm` (which fills the figure cache) and reports
+# how long it took and which share of the logged traffic it covers
+def run_warmup(plan, weights, warm):
+    start = time.perf_counter()
+    errors = 0
+    for values in plan:
+        try:
+            warm(values)
+        except Exception:
+            errors += 1
+    seconds = time.perf_counter() - start
+    report = {'filter_states': len(plan), 'errors': errors, 'seconds': seconds,
+              'ms_per_state': seconds * 1000 / len(plan) if plan else 0.0}
+    if weights:
+        warmed = {state_key(values) for values in plan}
+        report['traffic_coverage'] = sum(n for key, n in weights.items() if key in warmed) / sum(weights.values())
+    return report
+
+
+def print_report(report):
+    line = (f"warm-up: {report['filter_states']} filter states in {report['seconds']:.1f} s "
+            f"({report['ms_per_state']:.1f} ms each, {report['errors']} failed)")
+    if 'traffic_coverage' in report:
+        line += f", {report['traffic_coverage']:.1%} of logged requests covered"
+    print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute the dashboard charts of common filter states into the figure cache.')
+    parser.add_argument('--log', help='json lines of filter control values recorded with FILTER_LOG, to weight and extend the plan')
+    parser.add_argument('--limit', type=int, help='warm at most this many filter states, most requested first')
+    args = parser.parse_args()
+
+    # the dashboard's own configuration (dataset, quantile error, FIGURE_CACHE_PATH) so the cache keys match
+    from dashboard import catalog, figure_cache, warm_filter_state
+    if not figure_cache.path:
+        print('FIGURE_CACHE_PATH is not set, the warmed charts are not kept')
+    plan, weights = warmup_plan(catalog.active.neighbourhood_options, args.log, args.limit)
+    print_report(run_warmup(plan, weights, warm_filter_state))
+    figure_cache.save()
+    print(f"figure cache: {figure_cache.stats()}")